@@ -0,0 +1,120 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import freeze_support
+from threading import Lock
+from config.config import (
+    get_config, load_config,
+    PROCESSING_WORKERS_CONFIG, PROCESSING_MODE_CONFIG, OUTPUT_PROFILE_CONFIG,
+    PROCESSING_ENGINE_CONFIG, GRID_CONFIG
+)
+from utils.manifest import Manifest
+from utils.layout import Layout
+from utils.video_utils import process_videos, OUTPUT_PROFILES, PROCESSING_ENGINES
+
+# headless preprocessing, one JSON object per line on stdout
+
+output_lock = Lock()
+
+
+def emit(event: str, srcs_dir: str, **fields) -> None:
+    line = json.dumps({'event': event, 'dir': srcs_dir,
+                       'time': round(time.time(), 3), **fields})
+    with output_lock:
+        sys.stdout.write(line + '\n')
+        sys.stdout.flush()
+
+
+def run(srcs_dir: str, args: argparse.Namespace) -> bool:
+    start = time.perf_counter()
+    track = process_videos(srcs_dir, args.resize, args.crop, args.workers,
+                           args.processes, args.profile, args.engine, args.grid)
+    update = next(track)
+    metadata = update.metadata
+    frames_total = int(sum(metadata.frame_counts)) if metadata is not None else 0
+    emit('start', srcs_dir, videos=len(update.frames_done), frames_total=frames_total,
+         width=metadata.width if metadata is not None else 0,
+         height=metadata.height if metadata is not None else 0,
+         fps=metadata.fps if metadata is not None else 0)
+    msg = update.message()
+    if (msg != ''):
+        emit('message', srcs_dir, message=msg)
+
+    last_report = 0
+    for update in track:
+        msg = update.message()
+        while (msg != ''):
+            emit('message', srcs_dir, message=msg)
+            msg = update.message()
+        now = time.perf_counter()
+        if (now - last_report < args.interval):
+            continue
+        last_report = now
+        elapsed = now - start
+        frames_done = sum(update.frames_done)
+        emit('progress', srcs_dir, frames_done=frames_done, frames_total=frames_total,
+             percent=round(100 * update.amount_done / update.amount_total, 1)
+             if update.amount_total > 0 else 100.0,
+             completed=update.completed, elapsed=round(elapsed, 2),
+             fps=round(frames_done / elapsed, 1) if elapsed > 0 else 0,
+             mpix_per_s=round(update.amount_done / elapsed / 1e6, 1) if elapsed > 0 else 0)
+
+    # the manifest knows which sources did not make it to the end
+    elapsed = time.perf_counter() - start
+    failed = [video for video, item in Manifest.load(f'{srcs_dir}/.out').items.items()
+              if not item.get('complete')] if (args.resize or args.crop) else []
+    emit('done', srcs_dir, frames_done=sum(update.frames_done), completed=update.completed,
+         failed=failed, elapsed=round(elapsed, 2))
+    return len(failed) == 0
+
+
+def run_safely(srcs_dir: str, args: argparse.Namespace) -> bool:
+    try:
+        return run(srcs_dir, args)
+    except Exception as e:
+        emit('error', srcs_dir, error=str(e))
+        return False
+
+
+def main() -> int:
+    # defaults are the settings saved from the GUI, a different grid or
+    # format would throw away what it already processed
+    load_config()
+    parser = argparse.ArgumentParser(
+        description='Preprocess source directories without the GUI, reporting progress as JSON lines. '
+                    'Defaults come from the saved settings.')
+    parser.add_argument('dirs', nargs='+', help='source directories')
+    parser.add_argument('--resize', action='store_true',
+                        help='resize videos to the common aspect ratio')
+    parser.add_argument('--crop', action='store_true',
+                        help='crop every video into the sections of the grid')
+    parser.add_argument('--grid', type=Layout.parse,
+                        default=Layout(*get_config(GRID_CONFIG)),
+                        help='sections as COLUMNSxROWS')
+    parser.add_argument('--workers', type=int, default=get_config(PROCESSING_WORKERS_CONFIG),
+                        help='videos processed at once per directory, 0 for one per cpu')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='directories processed at once')
+    parser.add_argument('--processes', action=argparse.BooleanOptionalAction,
+                        default=get_config(PROCESSING_MODE_CONFIG) == 'process',
+                        help='run videos in worker processes instead of threads')
+    parser.add_argument('--profile', choices=list(OUTPUT_PROFILES.keys()),
+                        default=get_config(OUTPUT_PROFILE_CONFIG), help='output format')
+    parser.add_argument('--engine', choices=list(PROCESSING_ENGINES.keys()),
+                        default=get_config(PROCESSING_ENGINE_CONFIG),
+                        help='processing engine, ffmpeg falls back to opencv when missing')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between progress lines')
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max(1, args.jobs)) as executor:
+        results = list(executor.map(
+            lambda srcs_dir: run_safely(srcs_dir, args), args.dirs))
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    freeze_support()
+    sys.exit(main())
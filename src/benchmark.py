@@ -0,0 +1,303 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from os import cpu_count, makedirs, path
+from shutil import rmtree
+from tempfile import TemporaryDirectory
+from multiprocessing import freeze_support
+import cv2
+import numpy as np
+try:
+    import resource
+except ImportError:
+    resource = None
+from config.config import (
+    set_config, get_config,
+    ASPECT_RATIO_CONFIG, DECODE_BACKEND_CONFIG, OUTPUT_PROFILE_CONFIG, PROCESSING_ENGINE_CONFIG
+)
+from tiles.tile import Tiles
+from tiles.clock import SteppedClock
+from utils.layout import Layout
+from utils.video_index import write_index
+from utils.video_utils import process_videos
+
+# synthetic clips, rendered and processed without a window, results as JSON.
+# run it from the repository root, like main.py, so the statics are found
+
+FRAMES_BETWEEN_SWITCHES = 12
+
+
+def make_clip(clip_path: str, size: tuple[int, int], fps: float, frames: int) -> None:
+    # moving gradient and box, so the encoder and decoder do real work
+    w, h = size
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    y = np.linspace(0, 255, h, dtype=np.float32)
+    base = (x[None, :] + y[:, None]) / 2
+    writer = cv2.VideoWriter(clip_path, cv2.VideoWriter_fourcc(*'MJPG'),
+                             fps, size, True)
+    for i in range(frames):
+        shift = (base + i * 4) % 256
+        frame = np.dstack([shift, 255 - shift, np.roll(shift, i, axis=1)]
+                          ).astype(np.uint8)
+        bx = (i * 7) % max(1, w - w // 4)
+        by = (i * 5) % max(1, h - h // 4)
+        cv2.rectangle(frame, (bx, by), (bx + w // 4, by + h // 4),
+                      (255, 255, 255), -1)
+        cv2.putText(frame, f'{i}', (8, h - 8), cv2.FONT_HERSHEY_SIMPLEX,
+                    max(0.5, h / 240), (0, 0, 0), 2)
+        writer.write(frame)
+    writer.release()
+
+
+def make_show(show_dir: str, layout: Layout, landscapes: int, size: tuple[int, int], fps: float,
+              frames: int) -> list[str]:
+    # already cut sections, named and indexed like preprocessed outputs
+    paths = []
+    for landscape in range(landscapes):
+        for section in range(layout.count):
+            clip_path = f'{show_dir}/{landscape}_{section}.avi'
+            make_clip(clip_path, size, fps, frames)
+            write_index(clip_path, fps, frames)
+            paths.append(clip_path)
+    return paths
+
+
+def make_sources(srcs_dir: str, count: int, size: tuple[int, int], fps: float, frames: int) -> None:
+    # full landscapes, every other one off the common aspect ratio so that
+    # resizing has something to do
+    w, h = size
+    for i in range(count):
+        shape = (w, h) if i % 2 == 0 else (w, h + h // 8)
+        make_clip(f'{srcs_dir}/landscape{i}.avi', shape, fps, frames)
+
+
+def rss_mb() -> float | None:
+    # resident memory right now, only linux exposes it without extra packages
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * resource.getpagesize() / 2**20, 1)
+
+
+def rss_delta(before: float | None) -> dict | None:
+    after = rss_mb()
+    if (before is None or after is None):
+        return None
+    return {'before': before, 'after': after, 'growth': round(after - before, 1)}
+
+
+def peak_rss_mb() -> dict | None:
+    # process lifetime peaks, only meaningful once every case has run
+    if (resource is None):
+        return None
+    # kilobytes on linux, bytes on macos
+    unit = 2**20 if sys.platform == 'darwin' else 2**10
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1),
+    }
+
+
+def percentiles(samples: list[float]) -> dict | None:
+    if (len(samples) == 0):
+        return None
+    ms = np.array(samples) * 1000
+    return {
+        'mean': round(float(ms.mean()), 3),
+        'p50': round(float(np.percentile(ms, 50)), 3),
+        'p95': round(float(np.percentile(ms, 95)), 3),
+        'p99': round(float(np.percentile(ms, 99)), 3),
+        'max': round(float(ms.max()), 3),
+    }
+
+
+def framestamps(tiles: Tiles) -> list[int]:
+    return [0 if s is None else s.framestamp for s in tiles.sections]
+
+
+def bench_render(paths: list[str], layout: Layout, seconds: float, fps: float) -> dict:
+    # as fast as frames can be composed, the show clock moves a frame per
+    # pass so every pass decodes. wraps are frames where a section looped
+    # back to its start
+    clock = SteppedClock()
+    tiles = Tiles(paths, show=False, layout=layout, clock=clock)
+    times, wraps = [], []
+    previous = framestamps(tiles)
+    start = time.perf_counter()
+    while (time.perf_counter() - start < seconds):
+        t = time.perf_counter()
+        clock.advance(1 / fps)
+        tiles.update_frame()
+        dt = time.perf_counter() - t
+        times.append(dt)
+        stamps = framestamps(tiles)
+        if (any([stamps[i] < previous[i] for i in range(len(stamps))])):
+            wraps.append(dt)
+        previous = stamps
+    elapsed = time.perf_counter() - start
+    tiles.destroy()
+    return {
+        'fps': round(len(times) / elapsed, 1),
+        'frame_ms': percentiles(times),
+        'loop_wraps': len(wraps),
+        'loop_wrap_ms': percentiles(wraps),
+    }
+
+
+def bench_switch(paths: list[str], layout: Layout, switches: int, resume: bool, fps: float) -> dict:
+    # the switch itself, and until the new section's first frame is composed
+    clock = SteppedClock()
+    tiles = Tiles(paths, show=False, layout=layout, clock=clock)
+    calls, to_frame = [], []
+    for k in range(switches):
+        for _ in range(FRAMES_BETWEEN_SWITCHES):
+            clock.advance(1 / fps)
+            tiles.update_frame()
+        t = time.perf_counter()
+        tiles.switch_section(k % layout.count, resume)
+        calls.append(time.perf_counter() - t)
+        tiles.update_frame()
+        to_frame.append(time.perf_counter() - t)
+    tiles.destroy()
+    return {
+        'switch_ms': percentiles(calls),
+        'switch_to_frame_ms': percentiles(to_frame),
+    }
+
+
+def bench_processing(srcs_dir: str, resize: bool, crop: bool, workers: int,
+                     profile: str, engine: str, layout: Layout) -> dict:
+    rmtree(f'{srcs_dir}/.out', ignore_errors=True)
+    start = time.perf_counter()
+    update = None
+    for update in process_videos(srcs_dir, resize, crop, workers, False, profile, engine, layout):
+        pass
+    elapsed = time.perf_counter() - start
+    frames = sum(update.frames_done)
+    return {
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 1),
+        'mpix_per_s': round(update.amount_done / elapsed / 1e6, 1),
+    }
+
+
+def parse_sizes(value: str) -> list[tuple[int, int]]:
+    return [tuple([int(v) for v in size.split('x')]) for size in value.split(',')]
+
+
+def parse_numbers(value: str, kind=float) -> list:
+    return [kind(v) for v in value.split(',')]
+
+
+def parse_grids(value: str) -> list[str]:
+    return [Layout.parse(grid).name() for grid in value.split(',')]
+
+
+def revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=path.dirname(path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark rendering, switching and preprocessing on synthetic clips.')
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('320x180,640x360'),
+                        help='section sizes, WxH comma separated')
+    parser.add_argument('--fps', type=parse_numbers, default=parse_numbers('24'),
+                        help='clip frame rates, comma separated')
+    parser.add_argument('--landscapes', type=lambda v: parse_numbers(v, int),
+                        default=parse_numbers('2', int), help='landscape counts, comma separated')
+    parser.add_argument('--grids', type=parse_grids, default=parse_grids('3x2,3x3,4x3,4x4'),
+                        help='grids, COLUMNSxROWS comma separated')
+    parser.add_argument('--frames', type=int, default=48,
+                        help='frames per clip, short clips loop often')
+    parser.add_argument('--seconds', type=float, default=3,
+                        help='how long each render run lasts')
+    parser.add_argument('--switches', type=int, default=12,
+                        help='switches per switch run')
+    parser.add_argument('--backend', default=get_config(DECODE_BACKEND_CONFIG),
+                        help='decode backend for rendering')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='preprocessing workers, 0 for one per cpu')
+    parser.add_argument('--profile', default=get_config(OUTPUT_PROFILE_CONFIG),
+                        help='preprocessing output format')
+    parser.add_argument('--engine', default=get_config(PROCESSING_ENGINE_CONFIG),
+                        help='preprocessing engine')
+    parser.add_argument('--skip-render', action='store_true')
+    parser.add_argument('--skip-processing', action='store_true')
+    parser.add_argument('--out', help='write results to this file instead of stdout')
+    args = parser.parse_args()
+
+    set_config(DECODE_BACKEND_CONFIG, args.backend)
+    results = {
+        'revision': revision(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': cpu_count(),
+        'opencv': cv2.__version__,
+        'args': {k: v for k, v in vars(args).items() if k != 'out'},
+        'render': [],
+        'processing': [],
+    }
+
+    with TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            set_config(ASPECT_RATIO_CONFIG, list(size))
+            for grid in args.grids:
+                layout = Layout.parse(grid)
+                for fps in args.fps:
+                    for landscapes in ([] if args.skip_render else args.landscapes):
+                        show_dir = f'{tmp}/show_{size[0]}x{size[1]}_{grid}_{fps}_{landscapes}'
+                        makedirs(show_dir, exist_ok=True)
+                        paths = make_show(show_dir, layout, landscapes,
+                                          size, fps, args.frames)
+                        before = rss_mb()
+                        results['render'].append({
+                            'size': list(size), 'grid': grid, 'tiles': layout.count,
+                            'fps': fps, 'landscapes': landscapes,
+                            'render': bench_render(paths, layout, args.seconds, fps),
+                            'switch': bench_switch(paths, layout, args.switches, False, fps),
+                            'switch_resume': bench_switch(paths, layout, args.switches, True, fps),
+                        })
+                        # resident memory around this case alone
+                        results['render'][-1]['rss_mb'] = rss_delta(before)
+
+                if (args.skip_processing):
+                    continue
+                # whole landscapes the size of this grid's wall
+                canvas = layout.canvas_size(size)
+                srcs_dir = f'{tmp}/sources_{size[0]}x{size[1]}_{grid}'
+                makedirs(srcs_dir, exist_ok=True)
+                make_sources(srcs_dir, max(args.landscapes),
+                             canvas, args.fps[0], args.frames)
+                for (resize, crop) in [(True, False), (False, True), (True, True)]:
+                    before = rss_mb()
+                    results['processing'].append({
+                        'size': list(canvas), 'grid': grid, 'resize': resize, 'crop': crop,
+                        'result': bench_processing(srcs_dir, resize, crop, args.workers,
+                                                   args.profile, args.engine, layout),
+                    })
+                    results['processing'][-1]['rss_mb'] = rss_delta(before)
+
+    results['lifetime_peak_rss_mb'] = peak_rss_mb()
+    output = json.dumps(results, indent=2)
+    if (args.out is None):
+        print(output)
+    else:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    freeze_support()
+    sys.exit(main())
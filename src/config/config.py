@@ -14,6 +14,24 @@ FRAMERATE_CONFIG = 'framerate'
 MIDI_PORT_CONFIG = 'midi_port'
 MIDI_CONFIG = 'midi_map'
 KEYBOARD_CONFIG = 'key_map'
+STANDBY_BUDGET_CONFIG = 'standby_budget'
+LATE_FRAME_POLICY_CONFIG = 'late_frame_policy'
+DECODE_BACKEND_CONFIG = 'decode_backend'
+QUEUE_DEPTH_CONFIG = 'queue_depth'
+DECODE_MEMORY_CONFIG = 'decode_memory'
+PROCESSING_WORKERS_CONFIG = 'processing_workers'
+PROCESSING_MODE_CONFIG = 'processing_mode'
+OUTPUT_PROFILE_CONFIG = 'output_profile'
+PROCESSING_ENGINE_CONFIG = 'processing_engine'
+RENDER_LOG_CONFIG = 'render_log'
+HUD_KEY_CONFIG = 'hud_key'
+GRID_CONFIG = 'grid'
+QUALITY_GOVERNOR_CONFIG = 'quality_governor'
+TRANSITION_CONFIG = 'transition'
+TRANSITION_DURATION_CONFIG = 'transition_duration'
+AUDIO_CONFIG = 'audio'
+AUDIO_SECTION_CONFIG = 'audio_section'
+MUTE_KEY_CONFIG = 'mute_key'
 
 DEFAULT_CONFIG = {
     "landscape_num": 6,
@@ -23,6 +41,24 @@ DEFAULT_CONFIG = {
     "midi_port": 0,
     "midi_map": ["48", "49", "50", "44", "45", "46"],
     "key_map": ["4", "5", "6", "1", "2", "3"],
+    "standby_budget": 256,
+    "late_frame_policy": "drop",
+    "decode_backend": "ffmpeg",
+    "queue_depth": 24,
+    "decode_memory": 512,
+    "processing_workers": 0,
+    "processing_mode": "thread",
+    "output_profile": "mjpg",
+    "processing_engine": "ffmpeg",
+    "render_log": "",
+    "hud_key": "h",
+    "grid": [3, 2],
+    "quality_governor": True,
+    "transition": "cut",
+    "transition_duration": 0.5,
+    "audio": True,
+    "audio_section": 0,
+    "mute_key": "m",
 }
 
 cache: dict = dict()
@@ -43,6 +79,13 @@ def setup_config():
     save_thread.start()
 
 
+def load_config():
+    # read only, for tools that use the saved settings but never change them
+    global cache
+    if os.path.exists(FILE_NAME):
+        cache = _read_config_file()
+
+
 def teardown_config():
     global save_thread, kill_save_thread
     kill_save_thread = True
@@ -77,7 +120,7 @@ def save():
 def get_config(key: str) -> object | None:
     value = None
     if (cache is not None):
-        value = cache.get(key)
+        value = cache.get(key, DEFAULT_CONFIG.get(key))
     return value
 
 
@@ -14,14 +14,24 @@ from gui.widgets.QStatusDisplay import QStatusDisplay
 from gui.widgets.QTupleInput import QTupleInput
 from gui.widgets.QCollapsableSection import QCollapsableSection
 from gui.widgets.QMultiProgress import QMultiProgress
+from gui.widgets.QLabeledSelect import QLabeledSelect
+from gui.widgets.QQualityGrid import QQualityGrid
 from midi.midi import Midi, MidiMessageType
 from tiles import tile as T
+from tiles.transition import TRANSITIONS
 from config.config import (
     set_config, get_config,
     LANDSCAPE_NUM_CONFIG, PATH_CONFIG, ASPECT_RATIO_CONFIG, FRAMERATE_CONFIG,
-    MIDI_PORT_CONFIG, MIDI_CONFIG, KEYBOARD_CONFIG
+    MIDI_PORT_CONFIG, MIDI_CONFIG, KEYBOARD_CONFIG,
+    PROCESSING_WORKERS_CONFIG, PROCESSING_MODE_CONFIG, OUTPUT_PROFILE_CONFIG,
+    PROCESSING_ENGINE_CONFIG, GRID_CONFIG, QUALITY_GOVERNOR_CONFIG,
+    TRANSITION_CONFIG, TRANSITION_DURATION_CONFIG
 )
-from utils.video_utils import process_videos, VideoMetadata
+from utils.video_utils import (
+    process_videos, benchmark_profiles, isSupported, VideoMetadata, OUTPUT_PROFILES
+)
+from utils.layout import Layout, GRID_PRESETS
+from os import listdir
 
 WIDTH = 450
 HEIGHT = 600
@@ -31,6 +41,7 @@ class Window(QWidget):
     metadata = pyqtSignal(VideoMetadata)
     progressDone = pyqtSignal()
     alert = pyqtSignal(str)
+    benchmarkDone = pyqtSignal(str)
 
     # rendering
     __render_thread: Thread = None
@@ -40,6 +51,7 @@ class Window(QWidget):
     # gui layout
     __layout: QVBoxLayout = QVBoxLayout()
     __midi_status: QStatusDisplay = None
+    __midi_vbox: QVBoxLayout = None
 
     __landscapes: QLabeledIntInput = None
     __aspect_ratio: QTupleInput = None
@@ -58,11 +70,13 @@ class Window(QWidget):
         # set connection checking timer
         self.__timer = QTimer(self)
         self.__timer.timeout.connect(self.__update_midi_status)
+        self.__timer.timeout.connect(self.__update_quality)
         self.__timer.start(1000)
 
         self.metadata.connect(self.set_metadata)
         self.progressDone.connect(self.progress_done)
         self.alert.connect(self.launchAlert)
+        self.benchmarkDone.connect(self.benchmark_done)
 
         # draw gui
         self.ICON = QIcon('./statics/tile-icon.ico')
@@ -88,6 +102,16 @@ class Window(QWidget):
         hbox.addWidget(crop_checkbox)
         video_vbox.addLayout(hbox)
 
+        hbox = QHBoxLayout()
+        hbox.addWidget(QLabeledSelect('Output format',
+                                      list(OUTPUT_PROFILES.keys()),
+                                      get_config(OUTPUT_PROFILE_CONFIG),
+                                      lambda x: set_config(OUTPUT_PROFILE_CONFIG, x)))
+        self.benchmark_button = self.make_button(
+            'Benchmark formats', self.__benchmark_callback)
+        hbox.addWidget(self.benchmark_button)
+        video_vbox.addLayout(hbox)
+
         self.sources_button = self.make_button(
             f'Select sources: {get_config(PATH_CONFIG)}', self.__file_callback)
         video_vbox.addWidget(self.sources_button)
@@ -96,7 +120,14 @@ class Window(QWidget):
         self.__progress = QMultiProgress(self, 0,
                                          lambda args: process_videos(args,
                                                                      self.__processing_config['resize'],
-                                                                     self.__processing_config['crop'])
+                                                                     self.__processing_config['crop'],
+                                                                     get_config(
+                                                                         PROCESSING_WORKERS_CONFIG),
+                                                                     get_config(
+                                                                         PROCESSING_MODE_CONFIG) == 'process',
+                                                                     get_config(
+                                                                         OUTPUT_PROFILE_CONFIG),
+                                                                     get_config(PROCESSING_ENGINE_CONFIG))
                                          )
         # self.__progress.setHidden(True)
         # video_vbox.addWidget(self.__progress)
@@ -124,12 +155,37 @@ class Window(QWidget):
             extra_buttons=True
         )
         video_vbox.addWidget(self.framerate_input)
+        grid = Layout.from_config().name()
+        self.grid_select = QLabeledSelect('Grid (columns x rows)',
+                                          GRID_PRESETS if grid in GRID_PRESETS else [
+                                              grid] + GRID_PRESETS,
+                                          grid, self.__grid_callback)
+        video_vbox.addWidget(self.grid_select)
+        video_vbox.addWidget(QLabeledSelect('Transition', TRANSITIONS,
+                                            get_config(TRANSITION_CONFIG),
+                                            lambda x: set_config(TRANSITION_CONFIG, x)))
+        # the knob can be mapped to a midi cc to change it during the show
+        self.transition_input = QLabeledFloatInput(
+            midi,
+            'Transition duration (s)',
+            0, 4,
+            get_config(TRANSITION_DURATION_CONFIG),
+            lambda x: set_config(TRANSITION_DURATION_CONFIG, max(0, x)),
+            extra_buttons=True
+        )
+        video_vbox.addWidget(self.transition_input)
+        self.quality_grid = QQualityGrid('Section quality',
+                                         get_config(QUALITY_GOVERNOR_CONFIG),
+                                         lambda x: set_config(QUALITY_GOVERNOR_CONFIG, x))
+        self.quality_grid.setGrid(Layout.from_config())
+        video_vbox.addWidget(self.quality_grid)
         video_section.setContentLayout(video_vbox)
         self.__layout.addWidget(video_section)
         video_section.check()
 
         midi_section = QCollapsableSection('MIDI')
         midi_vbox = QVBoxLayout()
+        self.__midi_vbox = midi_vbox
         # midi_vbox.addWidget(
         #    QLabeledIntInput(
         #        midi,
@@ -156,14 +212,17 @@ class Window(QWidget):
     def set_metadata(self, metadata: VideoMetadata) -> None:
         self.__landscapes.setText(f'{metadata.total}')
         self.framerate_input.setText(f'{metadata.fps}')
-        w_shape, h_shape = metadata.width, metadata.height
-        h, w = int(h_shape / 2) - 1, int(w_shape / 3) - 1
+        w, h = Layout.from_config().cell_size(metadata.width, metadata.height)
         self.__aspect_ratio.setValue((w, h))
 
     def progress_done(self):
         self.sources_button.setDisabled(False)
         self.__progress_win.hide()
 
+    def benchmark_done(self, results: str):
+        self.benchmark_button.setDisabled(False)
+        self.launchAlert(results)
+
     # gui utils
     def make_button(self, title: str, callback: Callable) -> QPushButton:
         button = QPushButton(title)
@@ -173,11 +232,13 @@ class Window(QWidget):
     def make_controls_grid(self) -> QSelectablesGrid:
         grid = QSelectablesGrid(
             'Define control for each section: (midi | keyboard)')
-        midi_map = get_config(MIDI_CONFIG)
-        key_map = get_config(KEYBOARD_CONFIG)
-        for i in range(len(midi_map)):
-            row = int(i / 3)
-            column = int(i % 3)
+        layout = Layout.from_config()
+        midi_map = layout.fit(get_config(MIDI_CONFIG))
+        key_map = layout.fit(get_config(KEYBOARD_CONFIG))
+        set_config(MIDI_CONFIG, midi_map)
+        set_config(KEYBOARD_CONFIG, key_map)
+        for i in range(layout.count):
+            column, row = layout.position(i)
             grid.addSelectable(f'{midi_map[i]} | {key_map[i]}',
                                row, column)
         return grid
@@ -210,6 +271,10 @@ class Window(QWidget):
         status = self.__midi.is_device_connected()
         self.__midi_status.setStatus(status)
 
+    def __update_quality(self) -> None:
+        # levels are set by the governor on the render thread
+        self.quality_grid.setLevels(T.section_quality)
+
     def __file_callback(self) -> None:
         dir: str = QFileDialog.getExistingDirectory(
             self, 'Select scenes directory...', get_config(PATH_CONFIG))
@@ -219,6 +284,32 @@ class Window(QWidget):
         self.sources_button.setText(f'Select sources: {dir}')
         self.launchProgressDialog(dir)
 
+    def __benchmark_callback(self) -> None:
+        dir = get_config(PATH_CONFIG)
+        videos = sorted(filter(isSupported, listdir(dir))) if dir != '' else []
+        if (len(videos) == 0):
+            self.launchAlert(
+                'A sources directory with videos must be selected before benchmarking')
+            return
+        self.benchmark_button.setDisabled(True)
+        Thread(target=self.__benchmark,
+               args=[f'{dir}/{videos[0]}'], daemon=True).start()
+
+    def __benchmark(self, video_path: str) -> None:
+        # always reports back, the button stays disabled until it does
+        lines = [f'Sample: {video_path}']
+        try:
+            for r in benchmark_profiles(video_path):
+                if ('error' in r):
+                    lines.append(f"{r['profile']}: {r['error']}")
+                    continue
+                lines.append(f"{r['profile']}: {r['size_mb']} MB, encode {r['encode_fps']} fps, "
+                             f"decode {r['decode_fps']} fps (~{r['sections']} sections per core)")
+        except Exception as e:
+            lines.append(f'Benchmark failed: {e}')
+        finally:
+            self.benchmarkDone.emit('\n'.join(lines))
+
     def launchAlert(self, msg: str):
         QMessageBox.information(self, 'WARNING', msg)
 
@@ -238,6 +329,16 @@ class Window(QWidget):
         self.__progress_win.show()
         self.__progress.start.emit(dir)
 
+    def __grid_callback(self, value: str) -> None:
+        layout = Layout.parse(value)
+        set_config(GRID_CONFIG, [layout.columns, layout.rows])
+        # one control per section of the new grid
+        old_grid = self.selectables_grid
+        self.selectables_grid = self.make_controls_grid()
+        self.__midi_vbox.replaceWidget(old_grid, self.selectables_grid)
+        old_grid.deleteLater()
+        self.quality_grid.setGrid(layout)
+
     def __checkbox_callback(self, field: str) -> None:
         self.__processing_config[field] = self.sender().isChecked()
 
@@ -0,0 +1,27 @@
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtCore import Qt
+from typing import Callable
+
+
+class QLabeledSelect(QWidget):
+
+    _select: QComboBox = None
+    _callback: Callable[[str], None] = lambda: None
+
+    def __init__(self, title: str, options: list[str], default_value: str, callback: Callable[[str], None]):
+        super().__init__()
+        self.setMaximumHeight(60)
+        hbox = QHBoxLayout()
+        self.setLayout(hbox)
+        label = QLabel(title)
+        self._select = QComboBox()
+        self._select.addItems(options)
+        if (default_value in options):
+            self._select.setCurrentText(default_value)
+        self._callback = callback
+        self._select.currentTextChanged.connect(self._callback)
+        hbox.addWidget(label, alignment=Qt.AlignmentFlag.AlignLeft)
+        hbox.addWidget(self._select, alignment=Qt.AlignmentFlag.AlignRight)
+
+    def value(self) -> str:
+        return self._select.currentText()
@@ -36,9 +36,6 @@ class QMultiProgress(QWidget):
 
     __total: int = 0
     __count: int = 0
-    __amount_per_subprocess: list[int] = None
-    __total_amount: int = None
-    __size_per_subprocess: list[tuple[int, int]] = None
 
     __eta: int = 0
 
@@ -102,14 +99,6 @@ class QMultiProgress(QWidget):
         if (init.metadata is None):
             return
         self.setTotal(len(init.metadata.frame_counts))
-        self.__amount_per_subprocess = init.metadata.frame_counts
-        self.__size_per_subprocess = init.metadata.sizes
-        t = 0
-        for i in range(len(self.__amount_per_subprocess)):
-            size = self.__size_per_subprocess[i]
-            amnt = self.__amount_per_subprocess[i]
-            t += (amnt * size[0] * size[1])
-        self.__total_amount = t
 
         self.__window.metadata.emit(init.metadata)
         msg = init.message()
@@ -140,23 +129,17 @@ class QMultiProgress(QWidget):
         elapsed = update.elapsed_time
         msg = update.message()
 
-        eta = 0
+        # the totals are kept by the update itself, nothing to add up here
+        elapsed_amnt = update.amount_done + 0.001  # avoids division by 0
+        total_amnt = max(update.amount_total, elapsed_amnt)
+        remaining = total_amnt - elapsed_amnt
 
-        elapsed_amnt = 0.001  # avoids division by 0
-        cnt = 0
-        for i in range(self.__total):
-            size = self.__size_per_subprocess[i]
-            elapsed_amnt += (update.frames_done[i] * size[0] * size[1])
-            if (update.frames_done[i] == self.__amount_per_subprocess[i]):
-                cnt += 1
-        remaining = self.__total_amount - elapsed_amnt
-
-        self.setValue(int(elapsed_amnt * 100 / self.__total_amount))
+        self.setValue(int(elapsed_amnt * 100 / total_amnt))
 
         unit_time = (elapsed / elapsed_amnt)
         eta = int(unit_time * remaining)
 
-        self.setCount(cnt)
+        self.setCount(update.completed)
         self.setETA(eta)
         if (msg != ''):
             self.__window.alert.emit(msg)
@@ -0,0 +1,58 @@
+from PyQt6.QtWidgets import QWidget, QGridLayout, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox
+from PyQt6.QtCore import Qt
+from typing import Callable
+from utils.layout import Layout
+from tiles.governor import quality_levels
+from tiles.section import decode_backend
+
+# from full quality to the cheapest level
+COLORS = ['green', 'olive', 'orange', 'red']
+
+
+class QQualityGrid(QWidget):
+
+    __grid: QGridLayout = None
+    __labels: list[QLabel] = []
+
+    def __init__(self, title: str, enabled: bool, callback: Callable[[bool], None]) -> None:
+        super().__init__()
+        self.__labels = []
+        vbox = QVBoxLayout()
+        self.setLayout(vbox)
+        hbox = QHBoxLayout()
+        hbox.addWidget(QLabel(title), alignment=Qt.AlignmentFlag.AlignLeft)
+        checkbox = QCheckBox('Adaptive')
+        checkbox.setChecked(enabled)
+        checkbox.toggled.connect(callback)
+        hbox.addWidget(checkbox, alignment=Qt.AlignmentFlag.AlignRight)
+        vbox.addLayout(hbox)
+        self.__grid = QGridLayout()
+        vbox.addLayout(self.__grid)
+
+    def setGrid(self, layout: Layout) -> None:
+        # one label per section, laid out like the wall
+        for label in self.__labels:
+            self.__grid.removeWidget(label)
+            label.deleteLater()
+        self.__labels = []
+        for i in range(layout.count):
+            column, row = layout.position(i)
+            label = QLabel()
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.__grid.addWidget(label, row, column)
+            self.__labels.append(label)
+        self.setLevels([])
+
+    def setLevels(self, levels: list[int]) -> None:
+        # nothing rendering shows every section idle
+        for i in range(len(self.__labels)):
+            label = self.__labels[i]
+            if (i >= len(levels)):
+                label.setText('-')
+                label.setStyleSheet('color: gray;')
+                continue
+            names = quality_levels(decode_backend())
+            level = min(levels[i], len(names) - 1)
+            label.setText(names[level])
+            color = COLORS[round(level / max(1, len(names) - 1) * (len(COLORS) - 1))]
+            label.setStyleSheet(f'color: {color};')
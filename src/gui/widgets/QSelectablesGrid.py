@@ -11,6 +11,7 @@ class QSelectablesGrid(QWidget):
 
     def __init__(self, title: str) -> None:
         super().__init__()
+        self.__selectables = []
         vbox = QVBoxLayout()
         self.setLayout(vbox)
         label = QLabel(title)
@@ -1,3 +1,4 @@
+from multiprocessing import freeze_support
 from config.config import setup_config, teardown_config
 from midi.midi import Midi
 from gui.gui import draw_gui
@@ -12,4 +13,5 @@ def main():
 
 
 if __name__ == '__main__':
+    freeze_support()
     main()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+from queue import Queue, Empty
+from threading import Thread
+from time import perf_counter, sleep
+from tiles.clock import ShowClock
+from tiles.section import Section
+try:
+    from ffpyplayer.player import MediaPlayer
+except ImportError:
+    MediaPlayer = None
+
+# how often the show clock is compared with what is being heard
+SYNC_INTERVAL = 0.05
+# a seek takes a moment to be heard, its clock is not trusted until then
+SETTLE_TIME = 0.3
+# past this the sound is what is off, it is sent to the picture instead
+MAX_DRIFT = 0.5
+OPEN_TIMEOUT = 5.0
+POLL_INTERVAL = 0.01
+
+
+def is_available() -> bool:
+    return MediaPlayer is not None
+
+
+class AudioEngine:
+    # plays the sound of one landscape at a time on its own thread, so the
+    # render thread never waits on a player. every landscape's player is
+    # opened once and paused when not heard, switching is only a seek
+    muted: bool = False
+
+    __paths: list[str] = None
+    __players: list[MediaPlayer] = None
+    __clock: ShowClock = None
+    __commands: Queue = None
+    __thread: Thread = None
+
+    __current: int = None
+    __section: Section = None
+    __settled: float = 0
+    __last_pts: float = None
+
+    def __init__(self, paths: list[str], clock: ShowClock) -> None:
+        # one sound source per landscape, '' for a silent one
+        self.__paths = paths
+        self.__players = [None for _ in paths]
+        self.__clock = clock
+        self.__commands = Queue()
+
+    def start(self) -> AudioEngine:
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def follow(self, landscape_index: int, section: Section) -> None:
+        # hear this landscape, in step with what the section shows
+        self.__commands.put(('follow', landscape_index, section))
+
+    def set_mute(self, muted: bool) -> None:
+        self.muted = muted
+        self.__commands.put(('mute', muted))
+
+    def toggle_mute(self) -> None:
+        self.set_mute(not self.muted)
+
+    def stop(self) -> None:
+        if (self.__thread is None):
+            return
+        self.__commands.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def __run(self) -> None:
+        while True:
+            try:
+                command = self.__commands.get(timeout=SYNC_INTERVAL)
+            except Empty:
+                self.__sync()
+                continue
+            if (command is None):
+                break
+            if (command[0] == 'follow'):
+                self.__follow(command[1], command[2])
+            elif (command[0] == 'mute'):
+                player = self.__player(self.__current)
+                if (player is not None):
+                    player.set_mute(command[1])
+        for player in self.__players:
+            if (player is not None):
+                player.close_player()
+        self.__players = [None for _ in self.__paths]
+
+    def __player(self, landscape_index: int | None) -> MediaPlayer | None:
+        if (landscape_index is None or self.__paths[landscape_index] == ''):
+            return None
+        player = self.__players[landscape_index]
+        if (player is None):
+            try:
+                player = MediaPlayer(self.__paths[landscape_index], ff_opts={
+                    'vn': True, 'sn': True, 'sync': 'audio', 'loop': 0, 'paused': True,
+                }, loglevel='error')
+            except Exception as e:
+                print(f'[Audio:ERROR] :: failed to open {self.__paths[landscape_index]}: {e}')
+                self.__paths[landscape_index] = ''
+                return None
+            # seeking a player before it has read its streams crashes it
+            start = perf_counter()
+            while (player.get_metadata()['duration'] is None):
+                if (perf_counter() - start > OPEN_TIMEOUT):
+                    print(f'[Audio:ERROR] :: failed to open {self.__paths[landscape_index]}')
+                    player.close_player()
+                    self.__paths[landscape_index] = ''
+                    return None
+                sleep(POLL_INTERVAL)
+            self.__players[landscape_index] = player
+        return player
+
+    def __follow(self, landscape_index: int, section: Section) -> None:
+        if (landscape_index != self.__current):
+            previous = self.__player(self.__current)
+            if (previous is not None):
+                previous.set_pause(True)
+        self.__current = landscape_index
+        self.__section = section
+        player = self.__player(landscape_index)
+        if (player is None):
+            return
+        self.__seek(player)
+        player.set_mute(self.muted)
+        player.set_pause(False)
+
+    def __seek(self, player: MediaPlayer) -> None:
+        player.seek(self.__section.clip_time(self.__clock.now()), relative=False, accurate=False)
+        self.__settled = perf_counter() + SETTLE_TIME
+        self.__last_pts = None
+
+    def __sync(self) -> None:
+        # small drifts move the show clock to the sound, big ones move the
+        # sound back to the picture
+        player = self.__player(self.__current)
+        section = self.__section
+        if (player is None or section is None or section.video is None):
+            return
+        if (perf_counter() < self.__settled):
+            return
+        pts = player.get_pts()
+        # a source without sound never moves its clock
+        if (pts is None or pts != pts or pts == self.__last_pts):
+            return
+        self.__last_pts = pts
+        duration = section.duration()
+        error = pts - section.clip_time(self.__clock.now())
+        if (duration is not None and duration > 0):
+            # both sides loop, take the short way round
+            error = (error + duration / 2) % duration - duration / 2
+        if (abs(error) > MAX_DRIFT):
+            self.__seek(player)
+            return
+        self.__clock.adjust(error)
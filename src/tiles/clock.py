@@ -0,0 +1,39 @@
+from time import perf_counter
+
+# share of an outside master's drift taken on every adjustment, so the
+# picture eases into sync instead of jumping
+SLEW = 0.1
+
+
+class ShowClock:
+    # one monotonic time for the whole show, in seconds since it started.
+    # every section picks the frame whose timestamp matches it
+    __origin: float = 0
+    __last: float = 0
+
+    def __init__(self) -> None:
+        self.__origin = perf_counter()
+
+    def now(self) -> float:
+        # adjustments may pull the origin back, time never goes backwards,
+        # it only waits
+        now = perf_counter() - self.__origin
+        if (now < self.__last):
+            return self.__last
+        self.__last = now
+        return now
+
+    def adjust(self, error: float) -> None:
+        # a master clock, like the sound being heard, is error seconds ahead
+        self.__origin -= error * SLEW
+
+
+class SteppedClock(ShowClock):
+    # only moves when told to, for running the show faster than real time
+    __time: float = 0
+
+    def now(self) -> float:
+        return self.__time
+
+    def advance(self, seconds: float) -> None:
+        self.__time += seconds
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+from utils.layout import Layout
+
+
+class Compositor:
+    __canvas: np.ndarray = None
+    __slots: list[np.ndarray] = None
+    __scratch: list[np.ndarray] = None
+    __size: tuple[int, int] = None
+
+    def __init__(self, size: tuple[int, int], layout: Layout) -> None:
+        self.__size = size
+        w, h = size
+        # one persistent mosaic, every section is drawn into its own view of
+        # it, so a frame costs one copy or resize per slot whatever the grid
+        self.__canvas = np.zeros((h*layout.rows, w*layout.columns, 3), dtype=np.uint8)
+        self.__slots = []
+        # per slot room for a second frame during transitions, made on a
+        # slot's first transition and reused from then on
+        self.__scratch = [None for _ in range(layout.count)]
+        for i in range(layout.count):
+            column, row = layout.position(i)
+            x, y = column*w, row*h
+            self.__slots.append(self.__canvas[y:y+h, x:x+w])
+
+    def canvas(self) -> np.ndarray:
+        return self.__canvas
+
+    def slot(self, idx: int) -> np.ndarray:
+        return self.__slots[idx]
+
+    def draw(self, idx: int, frame, interpolation: int = cv2.INTER_LINEAR) -> None:
+        view = self.__slots[idx]
+        # fast path, frame already has the section size
+        if (frame.shape == view.shape):
+            np.copyto(view, frame)
+            return
+        cv2.resize(frame, self.__size, dst=view, interpolation=interpolation)
+
+    def __fit(self, idx: int, frame, interpolation: int):
+        view = self.__slots[idx]
+        if (frame.shape == view.shape):
+            return frame
+        if (self.__scratch[idx] is None):
+            self.__scratch[idx] = np.empty_like(view)
+        cv2.resize(frame, self.__size, dst=self.__scratch[idx], interpolation=interpolation)
+        return self.__scratch[idx]
+
+    def blend(self, idx: int, frame, weight: float, interpolation: int = cv2.INTER_LINEAR) -> None:
+        # mixes frame over what the slot already shows, in place
+        view = self.__slots[idx]
+        other = self.__fit(idx, frame, interpolation)
+        cv2.addWeighted(other, weight, view, 1 - weight, 0, dst=view)
+
+    def wipe(self, idx: int, frame, progress: float, interpolation: int = cv2.INTER_LINEAR) -> None:
+        # frame covers the slot from the wipe edge to the right
+        view = self.__slots[idx]
+        x = int(view.shape[1] * progress)
+        if (x >= view.shape[1]):
+            return
+        other = self.__fit(idx, frame, interpolation)
+        np.copyto(view[:, x:], other[:, x:])
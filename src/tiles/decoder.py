@@ -0,0 +1,147 @@
+from __future__ import annotations
+from queue import Queue, Empty, Full
+from threading import Thread, Event
+import cv2
+
+QUEUE_DEPTH = 24
+
+
+class Decoder:
+    stream: cv2.VideoCapture = None
+    frame = None
+    loops: int = 0
+    fps: float = 0
+
+    __queue: Queue = None
+    __thread: Thread = None
+    __terminate: Event = None
+
+    __loop: bool = False
+    __length: int = None
+    __position: int = 0
+    __size: tuple[int, int] = None
+    __interpolation: int = cv2.INTER_LINEAR
+    __step: int = 1
+
+    def __init__(self, source: str, frame: int = 0, loop: bool = False, length: int = None,
+                 size: tuple[int, int] = None, depth: int = QUEUE_DEPTH) -> None:
+        self.__loop = loop
+        self.__size = tuple(size) if size is not None else None
+        self.__length = length
+        self.__terminate = Event()
+        self.__queue = Queue(maxsize=max(1, depth))
+
+        self.stream = cv2.VideoCapture(source)
+        self.fps = self.stream.get(cv2.CAP_PROP_FPS)
+        if (frame > 0):
+            self.stream.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        grabbed, self.frame = self.stream.read()
+        if (not grabbed):
+            self.stream.release()
+            raise RuntimeError(
+                f'[Decoder:ERROR] :: failed to read {source} at frame {frame}')
+        self.frame = self.__scale(self.frame)
+        self.__position = frame
+        self.__queue.put((self.__position, self.frame))
+
+    def start(self) -> Decoder:
+        self.__thread = Thread(target=self.__update, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __scale(self, frame):
+        # scale on the decoder thread, the render thread gets section sized frames
+        size = self.__size
+        if (size is None or frame.shape[1::-1] == size):
+            return frame
+        return cv2.resize(frame, size, interpolation=self.__interpolation)
+
+    def __rewind(self) -> bool:
+        # looping clips seek back in place, the next loop keeps flowing
+        # into the same queue without tearing the thread down
+        if (not self.__loop or self.__position == 0):
+            return False
+        self.stream.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.__position = -1
+        self.loops += 1
+        return True
+
+    def __skip(self) -> None:
+        # decimated frames are only grabbed, never decoded nor scaled
+        for _ in range(self.__step - 1):
+            if (self.__length is not None and self.__position + 1 >= self.__length):
+                return
+            if (not self.stream.grab()):
+                return
+            self.__position += 1
+
+    def __put(self, item) -> bool:
+        while (not self.__terminate.is_set()):
+            try:
+                self.__queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def __update(self) -> None:
+        while (not self.__terminate.is_set()):
+            # the index tells exactly where the clip ends
+            if (self.__length is not None and self.__position + 1 >= self.__length
+                    and self.__rewind()):
+                continue
+            grabbed, frame = self.stream.read()
+            if (not grabbed):
+                if (self.__rewind()):
+                    continue
+                break
+            self.__position += 1
+            self.frame = self.__scale(frame)
+            self.__put((self.__position, self.frame))
+            self.__skip()
+
+        self.__put(None)
+        self.stream.release()
+
+    def read(self) -> tuple[int, object] | None:
+        while (not self.__terminate.is_set()):
+            try:
+                return self.__queue.get(timeout=0.1)
+            except Empty:
+                if (self.__thread is None or not self.__thread.is_alive()):
+                    return None
+        return None
+
+    def set_depth(self, depth: int) -> None:
+        # how many frames may be decoded ahead, changes apply right away
+        with self.__queue.mutex:
+            self.__queue.maxsize = max(1, depth)
+            self.__queue.not_full.notify_all()
+
+    def set_size(self, size: tuple[int, int] | None, interpolation: int = cv2.INTER_LINEAR) -> None:
+        self.__size = tuple(size) if size is not None else None
+        self.__interpolation = interpolation
+
+    def set_step(self, step: int) -> None:
+        # only every step-th frame is decoded
+        self.__step = max(1, step)
+
+    def queued(self) -> int:
+        return self.__queue.qsize()
+
+    def buffered_bytes(self) -> int:
+        if (self.frame is None):
+            return 0
+        return self.__queue.qsize() * self.frame.nbytes
+
+    def stop(self) -> None:
+        self.__terminate.set()
+        if (self.__thread is not None):
+            while (not self.__queue.empty()):
+                try:
+                    self.__queue.get_nowait()
+                except Empty:
+                    break
+            self.__thread.join()
+        else:
+            self.stream.release()
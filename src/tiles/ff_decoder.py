@@ -0,0 +1,172 @@
+from __future__ import annotations
+from queue import Queue, Empty, Full
+from threading import Thread, Event
+from time import sleep, perf_counter
+import numpy as np
+try:
+    from ffpyplayer.player import MediaPlayer
+    from ffpyplayer.tools import set_loglevel
+    set_loglevel('error')
+except ImportError:
+    MediaPlayer = None
+
+QUEUE_DEPTH = 24
+OPEN_TIMEOUT = 5.0
+POLL_INTERVAL = 0.001
+
+
+def is_available() -> bool:
+    return MediaPlayer is not None
+
+
+class FFDecoder:
+    frame = None
+    loops: int = 0
+    fps: float = 0
+
+    __player: MediaPlayer = None
+    __queue: Queue = None
+    __thread: Thread = None
+    __terminate: Event = None
+
+    __loop: bool = False
+    __position: int = -1
+    __seen: int = -1
+    __target: int = 0
+
+    def __init__(self, source: str, frame: int = 0, loop: bool = False, length: int = None,
+                 size: tuple[int, int] = None, depth: int = QUEUE_DEPTH) -> None:
+        self.__loop = loop
+        self.__terminate = Event()
+        self.__queue = Queue(maxsize=max(1, depth))
+
+        # video is the master clock, so frames come out as fast as they are
+        # pulled, already scaled to the section size by swscale. the player
+        # always loops by itself, it is the only way to get the last frame
+        self.__player = MediaPlayer(source, ff_opts={
+            'out_fmt': 'bgr24', 'an': True, 'sync': 'video', 'framedrop': False,
+            'loop': 0,
+        }, loglevel='error')
+        if (size is not None):
+            self.__player.set_size(int(size[0]), int(size[1]))
+
+        item = self.__next(OPEN_TIMEOUT)
+        rate = self.__player.get_metadata()['frame_rate']
+        self.fps = rate[0] / rate[1] if rate[1] != 0 else 0
+        if (frame > 0 and item is not None and self.fps > 0):
+            self.__target = frame
+            self.__player.seek(frame / self.fps,
+                               relative=False, accurate=True)
+            item = self.__next(OPEN_TIMEOUT)
+        if (item is None):
+            self.__player.close_player()
+            raise RuntimeError(
+                f'[Decoder:ERROR] :: failed to read {source} at frame {frame}')
+        self.frame = item[1]
+        self.__queue.put(item)
+
+    def __next(self, timeout: float = None) -> tuple[int, object] | None:
+        start = perf_counter()
+        while (not self.__terminate.is_set()):
+            if (timeout is not None and perf_counter() - start > timeout):
+                return None
+            frame, val = self.__player.get_frame()
+            if (val == 'eof'):
+                return None
+            if (frame is None):
+                sleep(POLL_INTERVAL)
+                continue
+
+            img, pts = frame
+            position = round(pts * self.fps) if self.fps > 0 else (
+                self.__position + 1)
+            seen, self.__seen = self.__seen, position
+            if (position < seen and position < self.__target):
+                # wrapped before reaching the target, it is past the end
+                if (not self.__loop):
+                    return None
+                self.__target = 0
+            # skip repeats and whatever was decoded before a seek landed
+            if (position == self.__position or position < self.__target):
+                continue
+            self.__target = 0
+            if (position < self.__position):
+                # the player wrapped around on its own, gaplessly
+                if (not self.__loop):
+                    return None
+                self.loops += 1
+            self.__position = position
+            w, h = img.get_size()
+            buffer = img.to_memoryview(keep_align=False)[0]
+            return (position, np.frombuffer(buffer, dtype=np.uint8).reshape(h, w, 3))
+        return None
+
+    def start(self) -> FFDecoder:
+        self.__thread = Thread(target=self.__update, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __put(self, item) -> bool:
+        while (not self.__terminate.is_set()):
+            try:
+                self.__queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def __update(self) -> None:
+        while (not self.__terminate.is_set()):
+            item = self.__next()
+            if (item is None):
+                break
+            self.frame = item[1]
+            self.__put(item)
+
+        self.__put(None)
+        self.__player.close_player()
+
+    def read(self) -> tuple[int, object] | None:
+        while (not self.__terminate.is_set()):
+            try:
+                return self.__queue.get(timeout=0.1)
+            except Empty:
+                if (self.__thread is None or not self.__thread.is_alive()):
+                    return None
+        return None
+
+    def set_depth(self, depth: int) -> None:
+        # how many frames may be decoded ahead, changes apply right away
+        with self.__queue.mutex:
+            self.__queue.maxsize = max(1, depth)
+            self.__queue.not_full.notify_all()
+
+    def set_size(self, size: tuple[int, int] | None, interpolation: int = None) -> None:
+        # swscale picks its own filter, only the size can change
+        if (size is not None):
+            self.__player.set_size(int(size[0]), int(size[1]))
+
+    def set_step(self, step: int) -> None:
+        # the player decodes every frame anyway, skipping would only make
+        # the picture worse, the governor never asks for it
+        pass
+
+    def queued(self) -> int:
+        return self.__queue.qsize()
+
+    def buffered_bytes(self) -> int:
+        if (self.frame is None):
+            return 0
+        return self.__queue.qsize() * self.frame.nbytes
+
+    def stop(self) -> None:
+        self.__terminate.set()
+        if (self.__thread is not None):
+            while (not self.__queue.empty()):
+                try:
+                    self.__queue.get_nowait()
+                except Empty:
+                    break
+            self.__thread.join()
+        else:
+            self.__player.close_player()
@@ -0,0 +1,99 @@
+from time import perf_counter
+import cv2
+
+# what a section costs at each quality level:
+# (decode scale, interpolation, frames per decoded frame)
+LEVELS = {
+    'full': (1.0, cv2.INTER_LINEAR, 1),
+    'nearest': (1.0, cv2.INTER_NEAREST, 1),
+    'half': (0.5, cv2.INTER_NEAREST, 1),
+    'half/2': (0.5, cv2.INTER_NEAREST, 2),
+    'full/2': (1.0, cv2.INTER_LINEAR, 2),
+}
+# only the levels that make a backend do less work, cheapest last. the
+# thread decoder scales on its own and grabs skipped frames without
+# decoding them. the process decoder's ring has a fixed frame size, but
+# its worker grabs skipped frames too. ffpyplayer decodes every frame
+# whatever happens, only swscale's output can shrink
+BACKEND_LEVELS = {
+    'thread': ['full', 'nearest', 'half', 'half/2'],
+    'process': ['full', 'full/2'],
+    'ffmpeg': ['full', 'half'],
+}
+
+
+def quality_levels(backend: str) -> list[str]:
+    return BACKEND_LEVELS.get(backend, BACKEND_LEVELS['thread'])
+
+
+# share of the frame period a frame may take before sections get cheaper,
+# and under which they get better again
+HIGH_LOAD = 0.9
+LOW_LOAD = 0.6
+# weight of the newest frame in the load average
+SMOOTHING = 0.1
+# stepping down is quick, stepping up waits until the headroom is real
+DOWN_INTERVAL = 0.5
+UP_INTERVAL = 2.0
+
+
+class QualityGovernor:
+    # one level per section, 0 is full quality
+    levels: list[int] = None
+    load: float = 0
+
+    __top: int = 0
+    __period: float = None
+    __last_change: float = 0
+    __next: int = 0
+
+    def __init__(self, count: int, fps: float, levels: int) -> None:
+        # levels is how many the decode backend has, see BACKEND_LEVELS
+        self.levels = [0 for _ in range(count)]
+        self.__top = levels - 1
+        self.set_fps(fps)
+        self.__last_change = perf_counter()
+
+    def set_fps(self, fps: float) -> None:
+        # the framerate input passes through 0 while it is being edited
+        if (fps is None or fps <= 0):
+            return
+        self.__period = 1 / fps
+
+    def reset(self) -> None:
+        self.levels = [0 for _ in self.levels]
+        self.load = 0
+
+    def update(self, frame_time: float) -> int | None:
+        # fed the busy time of every frame, returns the section whose level
+        # changed, if any
+        if (self.__period is None):
+            return None
+        self.load += SMOOTHING * (frame_time / self.__period - self.load)
+        now = perf_counter()
+        elapsed = now - self.__last_change
+        if (self.load > HIGH_LOAD and elapsed >= DOWN_INTERVAL):
+            index = self.__pick(min(self.levels))
+            if (self.levels[index] >= self.__top):
+                return None
+            self.levels[index] += 1
+        elif (self.load < LOW_LOAD and elapsed >= UP_INTERVAL):
+            if (max(self.levels) == 0):
+                return None
+            index = self.__pick(max(self.levels))
+            self.levels[index] -= 1
+        else:
+            return None
+        self.__last_change = now
+        return index
+
+    def __pick(self, level: int) -> int:
+        # round robin among the sections at that level, so the cost is
+        # spread over the wall instead of always hitting the same section
+        count = len(self.levels)
+        for i in range(count):
+            index = (self.__next + i) % count
+            if (self.levels[index] == level):
+                self.__next = (index + 1) % count
+                return index
+        return 0
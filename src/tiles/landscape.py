@@ -1,54 +1,42 @@
 from tiles.section import Section
-#from ffpyplayer.player import MediaPlayer
+from tiles.clock import ShowClock
 
 
 class Landscape:
-    def __init__(self, paths: list[str]) -> None:
-        self.sections: list[Section] = [Section(path) for path in paths]
-        self.audio_path = paths[0]
-        self.audio = None
+    def __init__(self, paths: list[str], clock: ShowClock = None, audio_path: str = '') -> None:
+        self.clock = clock if clock is not None else ShowClock()
+        self.sections: list[Section] = [
+            Section(path, loop=True, clock=self.clock) for path in paths]
+        # where the landscape's sound comes from, '' for none
+        self.audio_path = audio_path
         self.playing_sections: int = 0
 
-    def framestamp(self) -> int:
-        return max([s.framestamp for s in self.sections])
-
-    def start_audio(self) -> None:
-        if (self.audio is None):
-            pass
-            #self.audio = MediaPlayer(self.audio_path)
-
-    def stop_audio(self) -> None:
-        if (self.audio is not None):
-            print('stopping audio')
-            # self.audio.set_mute(True)
-            # self.audio.close_player()
-            #self.audio = None
+    def playhead(self) -> float:
+        # seconds into the landscape, sections with other framerates resume
+        # at the same time rather than the same frame. only sections on
+        # screen count, a stopped one keeps its last position forever
+        times = [s.time() for s in self.sections if s.video is not None]
+        return max(times) if len(times) > 0 else 0
 
     def start_section(self, idx: int, resume: bool = False) -> Section:
         self.playing_sections += 1
-        if (self.audio is None):
-            pass
-            # self.start_audio()
         if not resume:
             return self.sections[idx].start()
         else:
-            return self.sections[idx].start(self.framestamp())
+            return self.sections[idx].start(self.playhead())
 
     def stop_section(self, idx: int) -> None:
         self.playing_sections -= 1
-        if (self.playing_sections == 0):
-            pass
-            # self.stop_audio()
         return self.sections[idx].stop()
 
+    def release(self) -> None:
+        for section in self.sections:
+            section.release()
+
     def restart_section(self, idx: int) -> Section:
         self.stop_section(idx)
         return self.start_section(idx)
 
-    def get_frame(self, idx: int):
-        if (self.audio is not None):
-            _, val = self.audio.get_frame(show=False)
-            if val == 'eof':
-                pass
-                # self.stop_audio()
-        return self.sections[idx].read_frame()
+    def get_frame(self, idx: int, now: float = None):
+        # sound is played by tiles.audio, never from the frame path
+        return self.sections[idx].read_frame(now)
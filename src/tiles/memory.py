@@ -0,0 +1,58 @@
+from time import perf_counter
+from tiles.section import Section
+from tiles.standby import StandbyPool
+
+CHECK_INTERVAL = 1.0
+MIN_DEPTH = 2
+
+
+class MemoryAccountant:
+    depth: int = 0
+    section_bytes: list[int] = None
+    standby_bytes: int = 0
+    total: int = 0
+
+    __budget: int = 0
+    __max_depth: int = 0
+    __last_check: float = 0
+
+    def __init__(self, budget_mb: int, depth: int) -> None:
+        self.__budget = budget_mb * 1024 * 1024
+        self.__max_depth = max(MIN_DEPTH, depth)
+        self.depth = self.__max_depth
+        self.section_bytes = []
+
+    def measure(self, sections: list[Section], standby: StandbyPool) -> int:
+        self.section_bytes = [
+            0 if s is None else s.buffered_bytes() for s in sections]
+        self.standby_bytes = standby.used_bytes()
+        self.total = sum(self.section_bytes) + self.standby_bytes
+        return self.total
+
+    def update(self, sections: list[Section], standby: StandbyPool) -> None:
+        now = perf_counter()
+        if (now - self.__last_check < CHECK_INTERVAL):
+            return
+        self.__last_check = now
+        total = self.measure(sections, standby)
+
+        # read-ahead shrinks fast when over budget and grows back slowly
+        depth = self.depth
+        if (total > self.__budget):
+            depth = max(MIN_DEPTH, depth // 2)
+        elif (total < self.__budget / 2):
+            depth = min(self.__max_depth, depth + max(1, depth // 4))
+        if (depth == self.depth):
+            return
+        self.depth = depth
+        for section in sections:
+            if (section is not None):
+                section.set_depth(depth)
+
+    def report(self) -> dict:
+        return {
+            'depth': self.depth,
+            'sections_mb': [round(b / 2**20, 1) for b in self.section_bytes],
+            'standby_mb': round(self.standby_bytes / 2**20, 1),
+            'total_mb': round(self.total / 2**20, 1),
+        }
@@ -0,0 +1,140 @@
+import csv
+import json
+from time import perf_counter, time
+import cv2
+import numpy as np
+from tiles.scheduler import FrameScheduler
+from tiles.section import Section
+from tiles.memory import MemoryAccountant
+
+# stages of one render pass, in the order they happen
+STAGES = ['wait', 'decode', 'compose', 'scale', 'show', 'input', 'switch', 'frame']
+# samples kept per stage, a few seconds worth at show frame rates
+WINDOW = 256
+LOG_INTERVAL = 1.0
+HUD_INTERVAL = 0.25
+
+
+class RenderProbe:
+    # rolling per stage timings, only exists while someone is looking
+    lines: list[str] = None
+
+    __samples: dict[str, np.ndarray] = None
+    __counts: dict[str, int] = None
+
+    __log_path: str = ''
+    __log_file = None
+    __csv: csv.writer = None
+    __last_log: float = 0
+    __last_hud: float = 0
+
+    def __init__(self, log_path: str = '') -> None:
+        self.__samples = {stage: np.zeros(WINDOW) for stage in STAGES}
+        self.__counts = {stage: 0 for stage in STAGES}
+        self.__log_path = log_path
+        self.lines = []
+
+    def record(self, stage: str, seconds: float) -> None:
+        count = self.__counts[stage]
+        self.__samples[stage][count % WINDOW] = seconds
+        self.__counts[stage] = count + 1
+
+    def percentiles(self, stage: str) -> tuple[float, float, float]:
+        count = min(self.__counts[stage], WINDOW)
+        if (count == 0):
+            return (0, 0, 0)
+        p50, p95, p99 = np.percentile(
+            self.__samples[stage][:count], [50, 95, 99]) * 1000
+        return (round(p50, 2), round(p95, 2), round(p99, 2))
+
+    def snapshot(self, scheduler: FrameScheduler, sections: list[Section],
+                 memory: MemoryAccountant) -> dict:
+        stats = scheduler.stats()
+        usage = memory.report()
+        return {
+            'time': round(time(), 3),
+            'presented': stats['presented'],
+            'dropped': stats['dropped'],
+            'late': stats['late'],
+            'jitter_ms': round(stats['jitter_ms'], 2),
+            'stages_ms': {stage: self.percentiles(stage) for stage in STAGES},
+            'queued': [None if s is None else s.queued() for s in sections],
+            'quality': [None if s is None else s.quality for s in sections],
+            'memory_mb': usage['total_mb'],
+            'standby_mb': usage['standby_mb'],
+            'sections_mb': usage['sections_mb'],
+        }
+
+    def tick(self, scheduler: FrameScheduler, sections: list[Section],
+             memory: MemoryAccountant, hud: bool) -> None:
+        # percentiles are only worked out a few times per second
+        now = perf_counter()
+        if (self.__log_path != '' and now - self.__last_log >= LOG_INTERVAL):
+            self.__last_log = now
+            self.__write(self.snapshot(scheduler, sections, memory))
+        if (hud and now - self.__last_hud >= HUD_INTERVAL):
+            self.__last_hud = now
+            self.lines = self.__hud_lines(self.snapshot(scheduler, sections, memory))
+
+    def __hud_lines(self, snapshot: dict) -> list[str]:
+        lines = [f"frames {snapshot['presented']}  dropped {snapshot['dropped']}  "
+                 f"late {snapshot['late']}  jitter {snapshot['jitter_ms']}ms"]
+        for stage in STAGES:
+            p50, p95, p99 = snapshot['stages_ms'][stage]
+            lines.append(f'{stage:<8} {p50:6.2f} {p95:6.2f} {p99:6.2f} ms')
+        queued = ['-' if q is None else f'{q}' for q in snapshot['queued']]
+        lines.append(f"queued {' '.join(queued)}")
+        quality = ['-' if q is None else f'{q}' for q in snapshot['quality']]
+        lines.append(f"quality {' '.join(quality)}")
+        lines.append(f"memory {snapshot['memory_mb']}MB  standby {snapshot['standby_mb']}MB")
+        sections = ['-' if b == 0 else f'{b}' for b in snapshot['sections_mb']]
+        lines.append(f"sections_mb {' '.join(sections)}")
+        return lines
+
+    def draw(self, img) -> None:
+        if (len(self.lines) == 0):
+            return
+        line_h = 18
+        cv2.rectangle(img, (0, 0), (330, 8 + line_h*len(self.lines)),
+                      (0, 0, 0), -1)
+        for i in range(len(self.lines)):
+            cv2.putText(img, self.lines[i], (6, line_h*(i+1)), cv2.FONT_HERSHEY_PLAIN,
+                        1, (255, 255, 255), 1, cv2.LINE_AA)
+
+    def __write(self, snapshot: dict) -> None:
+        if (self.__log_file is None):
+            self.__log_file = open(self.__log_path, 'a', newline='')
+            if (self.__log_path.endswith('.csv')):
+                self.__csv = csv.writer(self.__log_file)
+                if (self.__log_file.tell() == 0):
+                    self.__csv.writerow(['time', 'presented', 'dropped', 'late', 'jitter_ms'] +
+                                        [f'{stage}_{p}' for stage in STAGES for p in ('p50', 'p95', 'p99')] +
+                                        ['queued', 'quality', 'memory_mb', 'standby_mb', 'sections_mb'])
+        if (self.__csv is not None):
+            self.__csv.writerow([snapshot['time'], snapshot['presented'], snapshot['dropped'],
+                                 snapshot['late'], snapshot['jitter_ms']] +
+                                [v for stage in STAGES for v in snapshot['stages_ms'][stage]] +
+                                [' '.join(['-' if q is None else f'{q}' for q in snapshot[key]])
+                                 for key in ('queued', 'quality')] +
+                                [snapshot['memory_mb'], snapshot['standby_mb'],
+                                 ' '.join([f'{b}' for b in snapshot['sections_mb']])])
+        else:
+            # anything but csv gets one JSON object per line
+            self.__log_file.write(json.dumps(snapshot) + '\n')
+        self.__log_file.flush()
+
+    def summary(self, scheduler: FrameScheduler, sections: list[Section],
+                memory: MemoryAccountant) -> None:
+        # end of show totals, csv logs get them as one last row
+        if (self.__log_path == ''):
+            return
+        if (self.__log_path.endswith('.csv')):
+            self.__write(self.snapshot(scheduler, sections, memory))
+            return
+        self.__write({'time': round(time(), 3), 'summary': scheduler.stats(),
+                      'memory': memory.report()})
+
+    def close(self) -> None:
+        if (self.__log_file is not None):
+            self.__log_file.close()
+            self.__log_file = None
@@ -0,0 +1,309 @@
+from __future__ import annotations
+from multiprocessing import Process, Pipe, Semaphore
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing import resource_tracker
+from threading import Lock
+import cv2
+import numpy as np
+
+RING_SLOTS = 4
+TIMEOUT = 0.1
+
+
+class Ring:
+    # frame positions followed by fixed size frame slots, in one shared block
+    def __init__(self, shm: SharedMemory, shape: tuple) -> None:
+        self.positions = np.ndarray(
+            (RING_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        self.frames = np.ndarray(
+            (RING_SLOTS,) + tuple(shape), dtype=np.uint8, buffer=shm.buf, offset=8*RING_SLOTS)
+
+    @staticmethod
+    def size(shape: tuple) -> int:
+        return RING_SLOTS * (8 + int(np.prod(shape)))
+
+
+def _decode(cap: cv2.VideoCapture, view, size: tuple[int, int] | None, scratch) -> tuple[bool, object]:
+    # decode straight into shared memory, or scale into it
+    if (size is None):
+        grabbed, img = cap.read(image=view)
+        if (grabbed and not np.may_share_memory(img, view)):
+            np.copyto(view, img)
+        return (grabbed, scratch)
+    grabbed, scratch = cap.read(image=scratch)
+    if (grabbed):
+        cv2.resize(scratch, size, dst=view)
+    return (grabbed, scratch)
+
+
+def _produce(conn: Connection, free, filled, ring: Ring, cap: cv2.VideoCapture,
+             first, position: int, loop: bool, length: int | None,
+             size: tuple[int, int] | None) -> bool:
+    # the first frame goes out right away, the rest waits for 'start'
+    free.acquire()
+    np.copyto(ring.frames[0], first)
+    ring.positions[0] = position
+    filled.release()
+    written = 1
+    started, done = False, False
+    scratch = None
+    step = 1
+
+    while True:
+        if (conn.poll(None if not started or done else 0)):
+            msg = conn.recv()
+            if (msg[0] == 'start'):
+                started = True
+            elif (msg[0] == 'close'):
+                return True
+            elif (msg[0] == 'quit'):
+                return False
+            elif (msg[0] == 'step'):
+                step = msg[1]
+            continue
+        if (not free.acquire(timeout=TIMEOUT)):
+            continue
+
+        slot = written % RING_SLOTS
+        view = ring.frames[slot]
+        rewind = (length is not None and position + 1 >= length)
+        grabbed = False
+        if (not rewind):
+            grabbed, scratch = _decode(cap, view, size, scratch)
+        if (not grabbed and loop and position > 0):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            position = -1
+            grabbed, scratch = _decode(cap, view, size, scratch)
+        if (grabbed):
+            position += 1
+            ring.positions[slot] = position
+            # decimated frames are only grabbed, never decoded
+            for _ in range(step - 1):
+                if ((length is not None and position + 1 >= length) or not cap.grab()):
+                    break
+                position += 1
+        else:
+            ring.positions[slot] = -1
+            done = True
+        written += 1
+        filled.release()
+
+
+def _work(conn: Connection, free, filled) -> None:
+    shm: SharedMemory = None
+    running = True
+    while (running):
+        msg = conn.recv()
+        if (msg[0] == 'quit'):
+            break
+        if (msg[0] != 'open'):
+            continue
+        _, path, frame, loop, length, size = msg
+
+        cap = cv2.VideoCapture(path)
+        if (frame > 0):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        grabbed, first = cap.read()
+        if (not grabbed):
+            cap.release()
+            conn.send(('error', f'failed to read {path} at frame {frame}'))
+            continue
+        if (size is not None):
+            first = cv2.resize(first, size)
+        conn.send(('shape', first.shape, cap.get(cv2.CAP_PROP_FPS)))
+
+        _, name, shape = conn.recv()
+        if (shm is None or shm.name != name):
+            if (shm is not None):
+                shm.close()
+            shm = SharedMemory(name=name)
+        running = _produce(conn, free, filled, Ring(shm, shape),
+                           cap, first, frame, loop, length, size)
+        cap.release()
+        conn.send(('closed',))
+
+    if (shm is not None):
+        shm.close()
+
+
+class DecodeWorker:
+    ring: Ring = None
+    fps: float = 0
+
+    __conn: Connection = None
+    __process: Process = None
+    __shm: SharedMemory = None
+
+    def __init__(self) -> None:
+        self.__conn, child = Pipe()
+        self.free = Semaphore(RING_SLOTS)
+        self.filled = Semaphore(0)
+        # workers must share the parent's tracker, which unlinks the blocks
+        resource_tracker.ensure_running()
+        self.__process = Process(target=_work, args=(
+            child, self.free, self.filled), daemon=True)
+        self.__process.start()
+
+    def is_alive(self) -> bool:
+        return self.__process.is_alive()
+
+    def open(self, path: str, frame: int, loop: bool, length: int | None,
+             size: tuple[int, int] | None) -> None:
+        self.__conn.send(('open', path, frame, loop, length, size))
+        reply = self.__conn.recv()
+        if (reply[0] == 'error'):
+            raise RuntimeError(f'[Decoder:ERROR] :: {reply[1]}')
+        shape, self.fps = reply[1], reply[2]
+        # the shared block only grows, smaller sources reuse it
+        if (self.__shm is None or self.__shm.size < Ring.size(shape)):
+            self.__release_shm()
+            self.__shm = SharedMemory(create=True, size=Ring.size(shape))
+        self.ring = Ring(self.__shm, shape)
+        self.__conn.send(('ring', self.__shm.name, shape))
+
+    def send(self, msg: tuple) -> None:
+        self.__conn.send(msg)
+
+    def close(self) -> None:
+        self.__conn.send(('close',))
+        self.__conn.recv()
+        # the worker is idle now, reset the ring for the next source
+        while (self.filled.acquire(False)):
+            pass
+        while (self.free.acquire(False)):
+            pass
+        for _ in range(RING_SLOTS):
+            self.free.release()
+
+    def __release_shm(self) -> None:
+        self.ring = None
+        if (self.__shm is None):
+            return
+        try:
+            self.__shm.close()
+        except BufferError:
+            # a frame view is still alive somewhere, the mapping goes with it
+            pass
+        self.__shm.unlink()
+        self.__shm = None
+
+    def quit(self) -> None:
+        if (self.is_alive()):
+            self.__conn.send(('quit',))
+            self.__process.join(1)
+        self.__release_shm()
+
+
+class DecodePool:
+    __idle: list[DecodeWorker] = None
+    __lock: Lock = None
+
+    def __init__(self) -> None:
+        self.__idle = []
+        self.__lock = Lock()
+
+    def acquire(self) -> DecodeWorker:
+        with self.__lock:
+            while (len(self.__idle) > 0):
+                worker = self.__idle.pop()
+                if (worker.is_alive()):
+                    return worker
+                worker.quit()
+        return DecodeWorker()
+
+    def release(self, worker: DecodeWorker) -> None:
+        with self.__lock:
+            self.__idle.append(worker)
+
+    def shutdown(self) -> None:
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for worker in idle:
+            worker.quit()
+
+
+pool = DecodePool()
+
+
+class ProcessDecoder:
+    frame = None
+    loops: int = 0
+    fps: float = 0
+
+    __worker: DecodeWorker = None
+    __read: int = 0
+    __held: bool = False
+    __eof: bool = False
+
+    def __init__(self, source: str, frame: int = 0, loop: bool = False, length: int = None,
+                 size: tuple[int, int] = None, depth: int = RING_SLOTS) -> None:
+        worker = pool.acquire()
+        try:
+            worker.open(source, frame, loop, length,
+                        tuple(size) if size is not None else None)
+        except RuntimeError:
+            pool.release(worker)
+            raise
+        self.__worker = worker
+        self.fps = worker.fps
+
+    def start(self) -> ProcessDecoder:
+        self.__worker.send(('start',))
+        return self
+
+    def read(self) -> tuple[int, object] | None:
+        # frames are views into the shared ring, valid until the next read
+        worker = self.__worker
+        if (worker is None or self.__eof):
+            return None
+        if (self.__held):
+            worker.free.release()
+            self.__held = False
+        while (not worker.filled.acquire(timeout=TIMEOUT)):
+            if (not worker.is_alive()):
+                return None
+        self.__held = True
+        slot = self.__read % RING_SLOTS
+        self.__read += 1
+        position = int(worker.ring.positions[slot])
+        if (position < 0):
+            self.__eof = True
+            return None
+        self.frame = worker.ring.frames[slot]
+        return (position, self.frame)
+
+    def set_depth(self, depth: int) -> None:
+        # the ring has a fixed number of slots
+        pass
+
+    def set_size(self, size: tuple[int, int] | None, interpolation: int = None) -> None:
+        # the ring is laid out for the size the worker was opened with
+        pass
+
+    def set_step(self, step: int) -> None:
+        # the worker grabs the frames in between without decoding them
+        if (self.__worker is not None):
+            self.__worker.send(('step', max(1, step)))
+
+    def queued(self) -> int | None:
+        if (self.__worker is None):
+            return 0
+        try:
+            return self.__worker.filled.get_value()
+        except NotImplementedError:
+            # macos semaphores cannot be read
+            return None
+
+    def buffered_bytes(self) -> int:
+        if (self.__worker is None or self.__worker.ring is None):
+            return 0
+        return self.__worker.ring.frames.nbytes
+
+    def stop(self) -> None:
+        worker, self.__worker = self.__worker, None
+        self.frame = None
+        if (worker is None):
+            return
+        worker.close()
+        pool.release(worker)
@@ -0,0 +1,72 @@
+from time import perf_counter, sleep
+
+DROP = 'drop'
+CATCH_UP = 'catchup'
+
+# never try to catch up on more than this, resync instead
+MAX_CATCH_UP = 0.25
+# frames starting later than this fraction of a period count as late
+LATE_FRACTION = 0.25
+
+
+class FrameScheduler:
+    presented: int = 0
+    dropped: int = 0
+    late: int = 0
+    jitter: float = 0
+    max_jitter: float = 0
+
+    __fps: float = None
+    __period: float = None
+    __deadline: float = None
+    __policy: str = DROP
+
+    def __init__(self, fps: float, policy: str = DROP) -> None:
+        self.__policy = policy if policy in (DROP, CATCH_UP) else DROP
+        self.set_fps(fps)
+
+    def set_fps(self, fps: float) -> None:
+        if (fps == self.__fps or fps is None or fps <= 0):
+            return
+        self.__fps = fps
+        self.__period = 1.0 / fps
+        # re-anchor the cadence on the new period
+        if (self.__deadline is not None):
+            self.__deadline = perf_counter() + self.__period
+
+    def wait(self) -> None:
+        # perf_counter is monotonic and, unlike monotonic() on windows,
+        # has sub-millisecond resolution
+        now = perf_counter()
+        if (self.__deadline is None):
+            self.__deadline = now
+        if (now < self.__deadline):
+            sleep(self.__deadline - now)
+            now = perf_counter()
+
+        lateness = now - self.__deadline
+        if (lateness > self.__period * LATE_FRACTION):
+            self.late += 1
+        self.jitter += (lateness - self.jitter) / 16
+        self.max_jitter = max(self.max_jitter, lateness)
+
+        # deadlines stay on a fixed grid, they never drift with the work
+        missed = int(lateness / self.__period)
+        if (missed > 0):
+            if (self.__policy == DROP):
+                self.dropped += missed
+                self.__deadline += missed * self.__period
+            elif (lateness > MAX_CATCH_UP):
+                self.dropped += missed
+                self.__deadline = now
+        self.__deadline += self.__period
+        self.presented += 1
+
+    def stats(self) -> dict:
+        return {
+            'presented': self.presented,
+            'dropped': self.dropped,
+            'late': self.late,
+            'jitter_ms': self.jitter * 1000,
+            'max_jitter_ms': self.max_jitter * 1000,
+        }
@@ -1,36 +1,282 @@
 from __future__ import annotations
-from vidgear.gears import CamGear
+from time import perf_counter
+from threading import Lock
+from tiles.decoder import Decoder
+from tiles.process_decoder import ProcessDecoder
+from tiles.ff_decoder import FFDecoder, is_available as has_ffpyplayer
+from tiles.governor import LEVELS, quality_levels
+from tiles.clock import ShowClock
+from utils.video_index import VideoIndex
+from utils.video_utils import probe_video
+from config.config import ASPECT_RATIO_CONFIG, DECODE_BACKEND_CONFIG, FRAMERATE_CONFIG, QUEUE_DEPTH_CONFIG, get_config
+
+# frames read in one go when a section is behind the clock, the rest is
+# caught up on the next ticks instead of stalling this one
+MAX_CATCHUP = 8
+
+DECODE_BACKENDS = {
+    'thread': Decoder,
+    'process': ProcessDecoder,
+    'ffmpeg': FFDecoder,
+}
+
+
+def decode_backend() -> str:
+    # the backend sections actually open, ffmpeg needs ffpyplayer
+    backend = get_config(DECODE_BACKEND_CONFIG)
+    if (backend not in DECODE_BACKENDS or (backend == 'ffmpeg' and not has_ffpyplayer())):
+        return 'thread'
+    return backend
 
 
 class Section:
-    def __init__(self, path: str):
+    def __init__(self, path: str, loop: bool = False, clock: ShowClock = None):
         self.path = path
-        self.video: CamGear = None
+        self.loop = loop
+        self.clock = clock if clock is not None else ShowClock()
+        self.video: Decoder | ProcessDecoder | FFDecoder = None
         self.framestamp: int = 0
+        self.seek_cost: float = 0
+        self.index: VideoIndex = None
+        self.standby: Decoder | ProcessDecoder | FFDecoder = None
+        self.depth: int = get_config(QUEUE_DEPTH_CONFIG)
+        self.quality: int = 0
+        self.interpolation: int = LEVELS['full'][1]
+        self.__step: int = 1
+        # show time of the clip's first frame, and the frame on screen
+        # counted across loops
+        self.__origin: float = 0
+        self.__base: int = 0
+        self.__shown: int = 0
+        self.__frame = None
+        self.__lock = Lock()
+        if (path != ''):
+            self.index = VideoIndex.load(path)
+        # without an index the rate comes from the first decoder opened,
+        # the show framerate is only a stand in until then
+        self.__timed = self.index is not None and self.index.fps > 0
+        self.fps: float = self.index.fps if self.__timed else get_config(FRAMERATE_CONFIG)
+
+    def length(self) -> int | None:
+        if (self.index is None):
+            return None
+        return self.index.frame_count
+
+    def frames_left(self) -> int | None:
+        if (self.index is None):
+            return None
+        return max(self.index.frame_count - self.framestamp, 0)
 
-    def read_frame(self):
+    def duration(self) -> float | None:
+        length = self.length()
+        if (length is None):
+            return None
+        return length / self.fps
+
+    def clip_time(self, now: float) -> float:
+        # where in the clip the show clock says the section is, in seconds
+        time = now - self.__origin
+        duration = self.duration()
+        if (self.loop and duration is not None and duration > 0):
+            return time % duration
+        return time
+
+    def time(self) -> float:
+        # where in the clip the section is, in seconds
+        return self.framestamp / self.fps
+
+    def read_frame(self, now: float = None):
         if self.video is None:
             return None
-        frame = self.video.read()
-        self.framestamp += 1
+        if (now is None):
+            now = self.clock.now()
+        # the frame on screen lasts until the clock reaches the next one, so
+        # slower clips repeat frames and faster ones drop them
+        target = int((now - self.__origin) * self.fps)
+        if (self.__frame is not None and self.__shown >= target):
+            return self.__frame
+        for _ in range(MAX_CATCHUP):
+            # the index knows where the clip ends, no need to wait on the decoder
+            if (not self.loop and self.frames_left() == 0):
+                return None
+            frame = self.__read()
+            if (frame is None):
+                return None
+            if (self.__shown >= target):
+                break
+        return self.__frame
+
+    def __read(self):
+        item = self.video.read()
+        if (item is None):
+            return None
+        position, frame = item
+        if (position + 1 < self.framestamp):
+            # the decoder looped back to the start
+            self.__base += self.length() or self.framestamp
+        self.framestamp = position + 1
+        self.__shown = self.__base + position
+        self.__frame = frame
         return frame
 
-    def seek(self, frames: int):
+    def level_name(self) -> str:
+        levels = quality_levels(decode_backend())
+        return levels[min(self.quality, len(levels) - 1)]
+
+    def decode_size(self) -> tuple[int, int]:
+        w, h = get_config(ASPECT_RATIO_CONFIG)
+        scale = LEVELS[self.level_name()][0]
+        return (max(1, int(w * scale)), max(1, int(h * scale)))
+
+    def set_quality(self, level: int) -> None:
+        # cheaper decoding for this section, see tiles.governor
+        self.quality = level
+        _, self.interpolation, self.__step = LEVELS[self.level_name()]
+        video = self.video
+        if (video is not None):
+            self.__apply_quality(video)
+
+    def __apply_quality(self, video: Decoder | ProcessDecoder | FFDecoder) -> None:
+        video.set_size(self.decode_size(), self.interpolation)
+        video.set_step(self.__step)
+
+    def seek_plan(self, frame: int) -> tuple[int, int]:
+        # where to jump to and how many frames to decode from there
+        if (self.index is None or self.index.frame_count == 0):
+            return (frame, 0)
+        frame = self.index.wrap(frame)
+        keyframe = self.index.keyframe(frame)
+        return (keyframe, frame - keyframe)
+
+    def __take_fps(self, fps: float) -> None:
+        if (not self.__timed and fps > 0):
+            self.fps = fps
+            self.__timed = True
+
+    def __open(self, frame: int) -> Decoder | ProcessDecoder | FFDecoder:
+        backend = DECODE_BACKENDS[decode_backend()]
+        # frames are decoded straight to the section size, a lower quality
+        # level is applied once the decoder is started
+        size = tuple(get_config(ASPECT_RATIO_CONFIG))
+        if (frame <= 0):
+            video = backend(self.path, 0, self.loop, self.length(), size, self.depth)
+            self.__take_fps(video.fps)
+            return video
+        # let the demuxer jump to the closest keyframe and decode forward
+        # from there, instead of decoding every frame from the start
+        try:
+            video = backend(self.path, frame, self.loop, self.length(), size, self.depth)
+        except RuntimeError:
+            # seeking past the end of the clip
+            return None
+        self.__take_fps(video.fps)
+        return video
+
+    def prepare(self) -> bool:
+        # opens a standby decoder primed with the first frame, so starting
+        # from the beginning only has to launch its thread
+        if (self.path == ''):
+            return False
+        with self.__lock:
+            if (self.standby is not None or self.video is not None):
+                return False
+        try:
+            standby = self.__open(0)
+        except RuntimeError:
+            return False
+        with self.__lock:
+            if (self.standby is None and self.video is None):
+                self.standby = standby
+                return True
+        standby.stop()
+        return False
+
+    def release_standby(self) -> None:
+        with self.__lock:
+            standby, self.standby = self.standby, None
+        if (standby is not None):
+            standby.stop()
+
+    def buffered_bytes(self) -> int:
+        video = self.video
+        if (video is None):
+            return 0
+        return video.buffered_bytes()
+
+    def queued(self) -> int | None:
+        # frames decoded ahead and waiting to be shown
+        video = self.video
+        if (video is None):
+            return 0
+        return video.queued()
+
+    def set_depth(self, depth: int) -> None:
+        self.depth = depth
+        video = self.video
+        if (video is not None):
+            video.set_depth(depth)
+
+    def standby_bytes(self) -> int:
+        standby = self.standby
+        if (standby is None):
+            return 0
+        return standby.buffered_bytes()
+
+    def seek(self, time: float) -> float:
         if self.video is None:
-            return
-        for _ in range(frames):
-            self.read_frame()
+            return 0
+        start = perf_counter()
+        self.stop()
+        self.start(time)
+        self.seek_cost = perf_counter() - start
+        return self.seek_cost
 
-    def start(self, frame_offset=0) -> Section:
+    def start(self, time: float = 0) -> Section:
+        # time is where in the clip to start, in seconds
         if (self.path == ''):
             return None
-        self.video = CamGear(source=self.path)
-        self.video.start()
-        self.framestamp = 0
-        self.seek(frame_offset)
+        start = perf_counter()
+        if (time > 0 and not self.__timed):
+            # the start frame depends on the rate, no decoder told it yet
+            self.__take_fps(probe_video(self.path)[2])
+        keyframe, remaining = self.seek_plan(round(time * self.fps))
+        self.framestamp = keyframe
+        video = None
+        with self.__lock:
+            standby, self.standby = self.standby, None
+        if (standby is not None and keyframe == 0):
+            video, standby = standby, None
+        if (standby is not None):
+            standby.stop()
+        if (video is None):
+            video = self.__open(keyframe)
+        if (video is None):
+            self.framestamp, remaining = 0, 0
+            video = self.__open(0)
+        video.set_depth(self.depth)
+        self.__base, self.__frame, self.__step = 0, None, 1
+        self.video = video.start()
+        for _ in range(remaining):
+            if (self.__read() is None):
+                break
+        # the frame landed on is due right now
+        self.__origin = self.clock.now() - (keyframe + remaining) / self.fps
+        # decimation only once the seek landed on the requested frame
+        if (self.quality > 0):
+            self.set_quality(self.quality)
+        self.seek_cost = perf_counter() - start
         return self
 
     def stop(self) -> None:
         if self.video is not None:
             self.video.stop()
         self.video = None
+        self.__frame = None
+
+    def release(self) -> None:
+        # for good, also gives back the index's map and file handle
+        self.stop()
+        self.release_standby()
+        index, self.index = self.index, None
+        if (index is not None):
+            index.close()
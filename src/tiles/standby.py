@@ -0,0 +1,56 @@
+from queue import Queue
+from threading import Thread, Lock
+from tiles.section import Section
+
+
+class StandbyPool:
+    __queue: Queue = None
+    __thread: Thread = None
+
+    __budget: int = 0
+    __frame_bytes: int = 0
+    __prepared: list[Section] = None
+    __lock: Lock = None
+
+    def __init__(self, budget_mb: int) -> None:
+        self.__budget = budget_mb * 1024 * 1024
+        # read on the render thread, appended to on the pool thread
+        self.__prepared = []
+        self.__lock = Lock()
+        self.__queue = Queue()
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def used_bytes(self) -> int:
+        with self.__lock:
+            self.__prepared = [s for s in self.__prepared if s.standby is not None]
+            prepared = list(self.__prepared)
+        return sum([s.standby_bytes() for s in prepared])
+
+    def request(self, section: Section) -> None:
+        if (section is None or section.path == ''):
+            return
+        self.__queue.put(section)
+
+    def __run(self) -> None:
+        while True:
+            section = self.__queue.get()
+            if (section is None):
+                break
+            # skip warming up when the next decoder would not fit the budget
+            if (self.used_bytes() + self.__frame_bytes > self.__budget):
+                continue
+            if (section.prepare()):
+                with self.__lock:
+                    self.__prepared.append(section)
+                self.__frame_bytes = max(
+                    self.__frame_bytes, section.standby_bytes())
+
+    def stop(self) -> None:
+        self.__queue.put(None)
+        self.__thread.join()
+        with self.__lock:
+            prepared, self.__prepared = self.__prepared, []
+        # only stopped on the way out, the sections are done for good
+        for section in prepared:
+            section.release()
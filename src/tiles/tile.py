@@ -1,128 +1,327 @@
 from os import listdir, path
-from time import time
+from time import monotonic, perf_counter
 import cv2
 import numpy as np
 import keyboard as kb
-from config.config import ASPECT_RATIO_CONFIG, FRAMERATE_CONFIG, KEYBOARD_CONFIG, LANDSCAPE_NUM_CONFIG, PATH_CONFIG, get_config, MIDI_CONFIG
+from config.config import ASPECT_RATIO_CONFIG, FRAMERATE_CONFIG, KEYBOARD_CONFIG, LANDSCAPE_NUM_CONFIG, LATE_FRAME_POLICY_CONFIG, PATH_CONFIG, STANDBY_BUDGET_CONFIG, DECODE_MEMORY_CONFIG, QUEUE_DEPTH_CONFIG, get_config, MIDI_CONFIG, RENDER_LOG_CONFIG, HUD_KEY_CONFIG, QUALITY_GOVERNOR_CONFIG, TRANSITION_CONFIG, TRANSITION_DURATION_CONFIG, AUDIO_CONFIG, AUDIO_SECTION_CONFIG, MUTE_KEY_CONFIG
 from tiles.landscape import Landscape
+from tiles.compositor import Compositor
+from tiles.standby import StandbyPool
+from tiles.scheduler import FrameScheduler
+from tiles.memory import MemoryAccountant
+from tiles.probe import RenderProbe
+from tiles.governor import QualityGovernor, quality_levels
+from tiles.clock import ShowClock
+from tiles.transition import Transition
+from tiles.audio import AudioEngine, is_available as has_audio
+from tiles import process_decoder
 from midi.midi import Midi, MidiMessageType
-from tiles.section import Section
+from tiles.section import Section, decode_backend
+from utils.video_utils import isSupported
+from utils.layout import Layout
+from utils.manifest import Manifest
+
+
+class ScalingPlan:
+    def __init__(self, shape: tuple, rect: tuple[int, int], padColor=0) -> None:
+        h, w = shape[:2]
+        sw, sh = rect
+        self.key = (shape, rect)
+        self.identity = (h == sh and w == sw)
+        if (self.identity):
+            return
+
+        # interpolation method
+        if h > sh or w > sw:  # shrinking image
+            self.interp = cv2.INTER_AREA
+        else:  # stretching image
+            self.interp = cv2.INTER_CUBIC
+
+        # aspect ratio of image
+        aspect = w/h
+        w_aspect = sw/sh
+
+        # compute scaling and pad sizing
+        if aspect > w_aspect:  # horizontal image
+            new_w = sw
+            new_h = np.round(new_w/aspect).astype(int)
+            pad_top = np.floor((sh-new_h)/2).astype(int)
+            pad_left = 0
+        elif aspect < w_aspect:  # vertical image
+            new_h = sh
+            new_w = np.round(new_h*aspect).astype(int)
+            pad_left = np.floor((sw-new_w)/2).astype(int)
+            pad_top = 0
+        else:  # square image
+            new_h, new_w = sh, sw
+            pad_left, pad_top = 0, 0
+        self.size = (int(new_w), int(new_h))
+
+        # set pad color
+        # color image but only one color provided
+        if len(shape) == 3 and not isinstance(padColor, (list, tuple, np.ndarray)):
+            padColor = [padColor]*shape[2]
+
+        # pre-padded destination, the borders are never written again
+        self.out = np.empty((sh, sw) + tuple(shape[2:]), dtype=np.uint8)
+        self.out[:] = padColor
+        self.view = self.out[pad_top:pad_top+new_h, pad_left:pad_left+new_w]
+
+    def apply(self, img):
+        if (self.identity):
+            return img
+        cv2.resize(img, self.size, dst=self.view, interpolation=self.interp)
+        return self.out
+
+
+RECT_POLL_INTERVAL = 0.25
+
+scaling_plan: ScalingPlan = None
+window_rect: tuple[int, int] = None
+window_rect_time: float = 0
+
+
+def get_window_size() -> tuple[int, int]:
+    global window_rect, window_rect_time
+    now = monotonic()
+    if (window_rect is None or now - window_rect_time > RECT_POLL_INTERVAL):
+        (_, _, sw, sh) = cv2.getWindowImageRect('Tyler')
+        window_rect = (sw, sh)
+        window_rect_time = now
+    return window_rect
 
 
 def resizeAndPadImage(img, padColor=0):
-    h, w = img.shape[:2]
-    (_, _, sw, sh) = cv2.getWindowImageRect('Tyler')
-
-    if (h == sh and w == sw):
+    global scaling_plan
+    rect = get_window_size()
+    if (rect[0] <= 0 or rect[1] <= 0):  # minimized window
         return img
 
-    # interpolation method
-    if h > sh or w > sw:  # shrinking image
-        interp = cv2.INTER_AREA
-    else:  # stretching image
-        interp = cv2.INTER_CUBIC
-
-    # aspect ratio of image
-    aspect = w/h
-    w_aspect = sw/sh
-
-    # compute scaling and pad sizing
-    if aspect > w_aspect:  # horizontal image
-        new_w = sw
-        new_h = np.round(new_w/aspect).astype(int)
-        pad_vert = (sh-new_h)/2
-        pad_top, pad_bot = np.floor(pad_vert).astype(
-            int), np.ceil(pad_vert).astype(int)
-        pad_left, pad_right = 0, 0
-    elif aspect < w_aspect:  # vertical image
-        new_h = sh
-        new_w = np.round(new_h*aspect).astype(int)
-        pad_horz = (sw-new_w)/2
-        pad_left, pad_right = np.floor(pad_horz).astype(
-            int), np.ceil(pad_horz).astype(int)
-        pad_top, pad_bot = 0, 0
-    else:  # square image
-        new_h, new_w = sh, sw
-        pad_left, pad_right, pad_top, pad_bot = 0, 0, 0, 0
-
-    # set pad color
-    # color image but only one color provided
-    if len(img.shape) == 3 and not isinstance(padColor, (list, tuple, np.ndarray)):
-        padColor = [padColor]*3
-
-    # scale and pad
-    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
-    scaled_img = cv2.copyMakeBorder(
-        scaled_img, pad_top, pad_bot, pad_left, pad_right, borderType=cv2.BORDER_CONSTANT, value=padColor)
-
-    return scaled_img
+    # the plan is only rebuilt when the mosaic or the window changes size
+    key = (img.shape, rect)
+    if (scaling_plan is None or scaling_plan.key != key):
+        scaling_plan = ScalingPlan(img.shape, rect, padColor)
+
+    return scaling_plan.apply(img)
 
 
 class Tiles:
 
-    def __init__(self, paths: list[str]) -> None:
+    def __init__(self, paths: list[str], show: bool = True, layout: Layout = None,
+                 clock: ShowClock = None, audio_paths: list[str] = None) -> None:
+        # without show the mosaic is composed but never put on screen
+        self.show = show
+        self.layout = layout if layout is not None else Layout.from_config()
+        self.clock = clock if clock is not None else ShowClock()
         self.AR = tuple(get_config(ASPECT_RATIO_CONFIG))
         self.IMG_NOT_FOUND = cv2.resize(
             cv2.imread('./statics/not-found.jpg'),
             self.AR
         )
-        if (len(paths) % 6 != 0):
-            raise AttributeError('must pass a multiple of 6 video paths')
-        landscape_num = int(len(paths) / 6)
-        self.landscape_for_section: list[int] = [0 for i in range(6)]
+        count = self.layout.count
+        if (len(paths) % count != 0):
+            raise AttributeError(
+                f'must pass a multiple of {count} video paths')
+        landscape_num = int(len(paths) / count)
+        self.landscape_for_section: list[int] = [0 for i in range(count)]
+        # the sound follows whatever landscape plays in this section
+        self.audio_section = min(max(get_config(AUDIO_SECTION_CONFIG), 0), count - 1)
+        if (audio_paths is None):
+            audio_paths = [paths[i*count + self.audio_section] for i in range(landscape_num)]
         self.landscapes: list[Landscape] = [
-            Landscape(paths[int(i*6):int(6*(i+1))]) for i in range(landscape_num)]
+            Landscape(paths[int(i*count):int(count*(i+1))], self.clock, audio_paths[i])
+            for i in range(landscape_num)]
+        self.compositor = Compositor(self.AR, self.layout)
         self.sections: list[Section] = [
-            self.landscapes[0].start_section(i) for i in range(6)]
-        cv2.namedWindow('Tyler', cv2.WINDOW_NORMAL)
-        cv2.resizeWindow('Tyler', self.AR[0]*3, self.AR[1]*2)
+            self.landscapes[0].start_section(i) for i in range(count)]
+        self.quality: list[int] = [0 for i in range(count)]
+        self.transitions: list[Transition] = [None for i in range(count)]
+        self.standby = StandbyPool(get_config(STANDBY_BUDGET_CONFIG))
+        self.memory = MemoryAccountant(get_config(DECODE_MEMORY_CONFIG),
+                                       get_config(QUEUE_DEPTH_CONFIG))
+        for i in range(count):
+            self.prepare_next(i)
+        # sound is part of showing, a headless run stays silent
+        self.audio: AudioEngine = None
+        if (self.show and get_config(AUDIO_CONFIG) and has_audio()):
+            self.audio = AudioEngine([l.audio_path for l in self.landscapes], self.clock).start()
+            self.follow_audio()
+        # timings are only taken while they are logged or on screen
+        self.log_path: str = get_config(RENDER_LOG_CONFIG) or ''
+        self.hud = False
+        self.probe: RenderProbe = RenderProbe(
+            self.log_path) if self.log_path != '' else None
+        if (self.show):
+            cv2.namedWindow('Tyler', cv2.WINDOW_NORMAL)
+            cv2.resizeWindow('Tyler', *self.layout.canvas_size(self.AR))
 
     def update_frame(self) -> None:
-        imgs = []
+        start = perf_counter()
+        # every section is sampled at the same instant of the show
+        now = self.clock.now()
+        frames = []
+        outgoing = []
         for i in range(len(self.sections)):
             section = self.sections[i]
             if section is None:
-                imgs.append(self.IMG_NOT_FOUND)
+                frames.append((self.IMG_NOT_FOUND, cv2.INTER_LINEAR))
             else:
                 landscape_index = self.landscape_for_section[i]
-                frame = self.landscapes[landscape_index].get_frame(i)
+                frame = self.landscapes[landscape_index].get_frame(i, now)
                 if frame is None:
                     section = self.restart_section(i)
                     frame = self.landscapes[landscape_index].get_frame(i)
-                imgs.append(cv2.resize(frame, self.AR))
-
-        l0 = np.hstack(tuple(imgs[:3]))
-        l1 = np.hstack(tuple(imgs[3:]))
-        out = np.vstack((l0, l1))
-
-        out = resizeAndPadImage(out)
+                frames.append((frame, section.interpolation))
+            transition = self.transitions[i]
+            if (transition is not None):
+                progress = transition.progress(now)
+                frame = transition.section.read_frame(now) if progress < 1 else None
+                if (frame is None):
+                    self.end_transition(i)
+                else:
+                    outgoing.append((i, transition, frame, progress))
+        decoded = perf_counter()
+        for i in range(len(frames)):
+            self.compositor.draw(i, *frames[i])
+        # the outgoing section goes over the incoming one, fading or wiping away
+        for (i, transition, frame, progress) in outgoing:
+            interpolation = transition.section.interpolation
+            if (transition.kind == 'wipe'):
+                self.compositor.wipe(i, frame, progress, interpolation)
+            else:
+                self.compositor.blend(i, frame, 1 - progress, interpolation)
+        # outgoing sections still hold decoded frames until they are gone
+        self.memory.update(self.sections + [t.section for t in self.transitions if t is not None],
+                           self.standby)
+        composed = perf_counter()
+        if (self.probe is not None):
+            self.probe.record('decode', decoded - start)
+            self.probe.record('compose', composed - decoded)
+        if (not self.show):
+            return
+
+        out = resizeAndPadImage(self.compositor.canvas())
+        if (self.hud):
+            self.probe.draw(out)
+        scaled = perf_counter()
 
         cv2.imshow('Tyler', out)
+        if (self.probe is not None):
+            self.probe.record('scale', scaled - composed)
+            self.probe.record('show', perf_counter() - scaled)
+
+    def toggle_hud(self) -> None:
+        global scaling_plan
+        self.hud = not self.hud
+        if (self.hud and self.probe is None):
+            self.probe = RenderProbe()
+        if (not self.hud):
+            # the overlay may have been drawn over padding, which is never
+            # redrawn, start over from a clean plan
+            scaling_plan = None
+            if (self.log_path == ''):
+                self.probe = None
 
     def restart_section(self, section_index: int) -> Section:
         landscape_index = self.landscape_for_section[section_index]
         self.sections[section_index] = self.landscapes[landscape_index].restart_section(
             section_index)
+        self.set_quality(section_index, self.quality[section_index])
+        if (section_index == self.audio_section):
+            self.follow_audio()
         return self.sections[section_index]
 
+    def follow_audio(self) -> None:
+        section = self.sections[self.audio_section]
+        if (self.audio is None or section is None):
+            return
+        self.audio.follow(self.landscape_for_section[self.audio_section], section)
+
+    def set_quality(self, section_index: int, level: int) -> None:
+        # the level belongs to the slot, whatever landscape plays in it
+        self.quality[section_index] = level
+        section = self.sections[section_index]
+        if (section is not None and section.quality != level):
+            section.set_quality(level)
+
     def switch_section(self, section_index: int, resume: bool = False) -> None:
+        # a switch during a transition cuts the previous one short
+        self.end_transition(section_index)
         landscape_index = self.landscape_for_section[section_index]
-        self.landscapes[landscape_index].stop_section(section_index)
-        landscape_index = (landscape_index + 1) % len(self.landscapes)
+        current = self.sections[section_index]
+        next_index = (landscape_index + 1) % len(self.landscapes)
+        kind = get_config(TRANSITION_CONFIG)
+        duration = get_config(TRANSITION_DURATION_CONFIG)
+        if (kind != 'cut' and duration > 0 and current is not None and
+                current is not self.landscapes[next_index].sections[section_index]):
+            self.transitions[section_index] = Transition(
+                kind, current, landscape_index, self.clock.now(), duration)
+        else:
+            self.landscapes[landscape_index].stop_section(section_index)
+        landscape_index = next_index
+        section = self.landscapes[landscape_index].sections[section_index]
+        section.set_depth(self.memory.depth)
         self.sections[section_index] = self.landscapes[landscape_index].start_section(
             section_index, resume)
         self.landscape_for_section[section_index] = landscape_index
+        self.set_quality(section_index, self.quality[section_index])
+        if (section_index == self.audio_section):
+            self.follow_audio()
+        self.prepare_next(section_index)
+
+    def end_transition(self, section_index: int, prepare: bool = True) -> None:
+        transition = self.transitions[section_index]
+        if (transition is None):
+            return
+        self.transitions[section_index] = None
+        self.landscapes[transition.landscape_index].stop_section(section_index)
+        # it could not be warmed up while it was still playing
+        if (prepare):
+            self.prepare_next(section_index)
+
+    def prepare_next(self, section_index: int) -> None:
+        # warm up the decoder this slot will switch to next
+        landscape_index = self.landscape_for_section[section_index]
+        landscape_index = (landscape_index + 1) % len(self.landscapes)
+        self.standby.request(
+            self.landscapes[landscape_index].sections[section_index])
+
+    def destroy(self) -> None:
+        if (self.probe is not None):
+            self.probe.close()
+        if (self.audio is not None):
+            self.audio.stop()
+        # nothing is warmed up again on the way out
+        for i in range(len(self.transitions)):
+            self.end_transition(i, prepare=False)
+        self.standby.stop()
+        for i in range(len(self.sections)):
+            landscape_index = self.landscape_for_section[i]
+            self.landscapes[landscape_index].stop_section(i)
+        for landscape in self.landscapes:
+            landscape.release()
+        process_decoder.pool.shutdown()
+
 
+HUD_TOGGLE = -2
+MUTE_TOGGLE = -3
 
-def get_keyboard_input() -> tuple[int, bool]:
-    key_map: list = get_config(KEYBOARD_CONFIG)
+
+def get_keyboard_input(layout: Layout) -> tuple[int, bool]:
+    key_map: list = layout.fit(get_config(KEYBOARD_CONFIG))
     key = cv2.waitKey(1)
     if key == -1 and not kb.is_pressed('ctrl'):
         return (None, False)
     if key == 27:
         return (-1, False)
+    if key != -1 and chr(key & 0xFF).lower() == get_config(HUD_KEY_CONFIG).lower():
+        return (HUD_TOGGLE, False)
+    if key != -1 and chr(key & 0xFF).lower() == get_config(MUTE_KEY_CONFIG).lower():
+        return (MUTE_TOGGLE, False)
     for i in range(len(key_map)):
         key = key_map[i]
+        if (key == ''):
+            continue
         if (kb.is_pressed(f'ctrl + {key}')):
             return (i, True)
         if (kb.is_pressed(key)):
@@ -133,32 +332,47 @@ def get_keyboard_input() -> tuple[int, bool]:
 def setup_tiles() -> Tiles:
     num = get_config(LANDSCAPE_NUM_CONFIG)
     srcs_dir = get_config(PATH_CONFIG)
+    layout = Layout.from_config()
+    count = layout.count
 
     # if videos were preprocessed
+    sources_dir = srcs_dir
     if path.exists(f'{srcs_dir}/.out'):
         srcs_dir = f'{srcs_dir}/.out'
 
     # Load files
-    files = ['' for i in range(6*num)]
-    for file in listdir(srcs_dir):
+    files = ['' for i in range(count*num)]
+    for file in filter(isSupported, listdir(srcs_dir)):
         (a, b) = file.split('.', 1)[0].split('_')
         (landscape_idx, section_idx) = (int(a), int(b))
-        i = landscape_idx * 6 + section_idx
-        if (i >= 6*num):
+        i = landscape_idx * count + section_idx
+        if (section_idx >= count or i >= count*num):
             continue
         files[i] = srcs_dir + '/' + file
 
-    return Tiles(files)
+    # outputs carry no sound, it is played from the source they were cut from
+    manifest = Manifest.load(srcs_dir) if srcs_dir != sources_dir else None
+    audio_section = min(max(get_config(AUDIO_SECTION_CONFIG), 0), count - 1)
+    audio_paths = []
+    for landscape_idx in range(num):
+        file = files[landscape_idx * count + audio_section]
+        source = manifest.source_of(path.basename(file)) if (
+            manifest is not None and file != '') else None
+        audio_paths.append(file if source is None else f'{sources_dir}/{source}')
+
+    return Tiles(files, layout=layout, audio_paths=audio_paths)
 
 
 midi_input: int = None
+# quality level of every section while rendering, read by the gui
+section_quality: list[int] = []
 
 
 def handle_midi_note_on(note: int, velocity: int) -> None:
     global midi_input
     if (velocity == 0):
         return
-    midi_map: list = get_config(MIDI_CONFIG)
+    midi_map: list = Layout.from_config().fit(get_config(MIDI_CONFIG))
     try:
         midi_input = midi_map.index(f'{note}')
     except ValueError:
@@ -166,29 +380,67 @@ def handle_midi_note_on(note: int, velocity: int) -> None:
 
 
 def render(midi: Midi):
-    global midi_input
+    global midi_input, section_quality
     tiles = setup_tiles()
 
     # subscribe to midid events
     midi.subscribe(MidiMessageType.NOTE_ON,
                    handle_midi_note_on)
 
-    prev = 0
+    scheduler = FrameScheduler(get_config(FRAMERATE_CONFIG),
+                               get_config(LATE_FRAME_POLICY_CONFIG))
+    governor = QualityGovernor(tiles.layout.count, get_config(FRAMERATE_CONFIG),
+                               len(quality_levels(decode_backend())))
+    section_quality = list(tiles.quality)
     while cv2.getWindowProperty('Tyler', cv2.WND_PROP_VISIBLE) >= 1:
-        fps = get_config(FRAMERATE_CONFIG)
-
-        time_elapsed = time() - prev
-        if (time_elapsed > 1.0 / fps):
-            prev = time()
-            tiles.update_frame()
-
-        key, resume = get_keyboard_input()
+        scheduler.set_fps(get_config(FRAMERATE_CONFIG))
+        governor.set_fps(get_config(FRAMERATE_CONFIG))
+        start = perf_counter()
+        scheduler.wait()
+        waited = perf_counter()
+        tiles.update_frame()
+
+        updated = perf_counter()
+        key, resume = get_keyboard_input(tiles.layout)
+        polled = perf_counter()
         if key == -1:
             break
+        if key == HUD_TOGGLE:
+            tiles.toggle_hud()
+            key = None
+        if key == MUTE_TOGGLE:
+            if (tiles.audio is not None):
+                tiles.audio.toggle_mute()
+            key = None
         if midi_input is not None:
             tiles.switch_section(midi_input, resume=kb.is_pressed('ctrl'))
             midi_input = None
         if key is not None:
             tiles.switch_section(key, resume)
 
+        end = perf_counter()
+        if (get_config(QUALITY_GOVERNOR_CONFIG)):
+            # switches are one offs, only steady work counts as load
+            index = governor.update(polled - waited)
+            if (index is not None):
+                tiles.set_quality(index, governor.levels[index])
+                section_quality = list(tiles.quality)
+        elif (max(tiles.quality) > 0):
+            governor.reset()
+            for i in range(len(tiles.quality)):
+                tiles.set_quality(i, 0)
+            section_quality = list(tiles.quality)
+
+        probe = tiles.probe
+        if (probe is not None):
+            probe.record('wait', waited - start)
+            probe.record('input', polled - updated)
+            probe.record('switch', end - polled)
+            probe.record('frame', end - waited)
+            probe.tick(scheduler, tiles.sections, tiles.memory, tiles.hud)
+
+    if (tiles.probe is not None):
+        tiles.probe.summary(scheduler, tiles.sections, tiles.memory)
+    section_quality = []
+    tiles.destroy()
     cv2.destroyAllWindows()
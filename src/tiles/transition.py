@@ -0,0 +1,28 @@
+from tiles.section import Section
+
+# how a slot goes from its outgoing section to the incoming one
+TRANSITIONS = ['cut', 'crossfade', 'wipe']
+
+
+class Transition:
+    # the outgoing section keeps playing underneath until it is over
+    kind: str = 'cut'
+    section: Section = None
+    landscape_index: int = 0
+
+    __start: float = 0
+    __duration: float = 0
+
+    def __init__(self, kind: str, section: Section, landscape_index: int, start: float,
+                 duration: float) -> None:
+        self.kind = kind
+        self.section = section
+        self.landscape_index = landscape_index
+        self.__start = start
+        self.__duration = duration
+
+    def progress(self, now: float) -> float:
+        # 0 when it starts, 1 once the incoming section is all there is
+        if (self.__duration <= 0):
+            return 1
+        return min(max((now - self.__start) / self.__duration, 0), 1)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from config.config import GRID_CONFIG, get_config
+
+# presets offered in the GUI, any columns x rows works
+GRID_PRESETS = ['3x2', '3x3', '4x3', '4x4', '5x4', '6x4']
+
+
+class Layout:
+    # the wall every landscape is cut into, sections are numbered left to
+    # right and top to bottom
+    columns: int = 3
+    rows: int = 2
+
+    def __init__(self, columns: int = 3, rows: int = 2) -> None:
+        if (columns < 1 or rows < 1):
+            raise ValueError(f'invalid grid {columns}x{rows}')
+        self.columns = int(columns)
+        self.rows = int(rows)
+
+    @staticmethod
+    def from_config() -> Layout:
+        columns, rows = get_config(GRID_CONFIG)
+        return Layout(columns, rows)
+
+    @staticmethod
+    def parse(value: str) -> Layout:
+        columns, rows = value.lower().split('x')
+        return Layout(int(columns), int(rows))
+
+    @property
+    def count(self) -> int:
+        return self.columns * self.rows
+
+    def name(self) -> str:
+        return f'{self.columns}x{self.rows}'
+
+    def position(self, index: int) -> tuple[int, int]:
+        # (column, row) of a section
+        return (index % self.columns, index // self.columns)
+
+    def canvas_size(self, size: tuple[int, int]) -> tuple[int, int]:
+        return (size[0] * self.columns, size[1] * self.rows)
+
+    def cell_size(self, w_frame: int, h_frame: int) -> tuple[int, int]:
+        # a pixel short of an even split, so every cut stays inside the frame
+        return (int(w_frame / self.columns) - 1, int(h_frame / self.rows) - 1)
+
+    def crop_rects(self, w_frame: int, h_frame: int) -> list[tuple[int, int, int, int]]:
+        # (x, y, w, h) of every section inside a frame
+        w, h = self.cell_size(w_frame, h_frame)
+        rects = []
+        for i in range(self.count):
+            column, row = self.position(i)
+            rects.append((column*w, row*h, w, h))
+        return rects
+
+    def fit(self, values: list, fill='') -> list:
+        # per section settings, like the control maps, sized to the grid
+        return (list(values) + [fill for _ in range(self.count)])[:self.count]
@@ -0,0 +1,103 @@
+from __future__ import annotations
+import json
+from os import path, stat, replace, remove, listdir
+from threading import Lock
+from utils.video_index import index_path
+
+MANIFEST = 'manifest.json'
+VERSION = 1
+
+
+def fingerprint(file_path: str) -> list:
+    st = stat(file_path)
+    return [st.st_size, st.st_mtime]
+
+
+class Manifest:
+    # what every source in .out was processed from and with, and whether
+    # its outputs were fully written
+    items: dict = None
+
+    __out_dir: str = None
+    __lock: Lock = None
+
+    def __init__(self, out_dir: str, items: dict = None) -> None:
+        self.__out_dir = out_dir
+        self.__lock = Lock()
+        self.items = items if items is not None else dict()
+
+    @staticmethod
+    def load(out_dir: str) -> Manifest:
+        # a missing or unreadable manifest means nothing can be trusted
+        try:
+            with open(f'{out_dir}/{MANIFEST}') as f:
+                data = json.load(f)
+            if (data.get('version') == VERSION):
+                return Manifest(out_dir, data.get('items', dict()))
+        except (OSError, ValueError, AttributeError):
+            pass
+        return Manifest(out_dir)
+
+    def save(self) -> None:
+        with self.__lock:
+            self.__save()
+
+    def __save(self) -> None:
+        # write then rename, an interrupted save never leaves half a manifest
+        tmp = f'{self.__out_dir}/{MANIFEST}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': VERSION, 'items': self.items}, f)
+        replace(tmp, f'{self.__out_dir}/{MANIFEST}')
+
+    def is_done(self, video: str, source: list, params: dict, outputs: list[str]) -> bool:
+        item = self.items.get(video)
+        if (item is None or not item.get('complete')):
+            return False
+        if (item.get('source') != source or item.get('params') != params):
+            return False
+        written = dict(item.get('outputs', []))
+        if (sorted(written.keys()) != sorted(outputs)):
+            return False
+        # outputs touched after the run are not ours anymore
+        for name, size in written.items():
+            out_path = f'{self.__out_dir}/{name}'
+            if (not path.exists(out_path) or stat(out_path).st_size != size):
+                return False
+        return True
+
+    def source_of(self, name: str) -> str | None:
+        # the source an output was cut from
+        for video, item in self.items.items():
+            if (name in dict(item.get('outputs', []))):
+                return video
+        return None
+
+    def start(self, video: str, source: list, params: dict) -> None:
+        with self.__lock:
+            self.items[video] = {'source': source, 'params': params,
+                                 'outputs': [], 'complete': False}
+            self.__save()
+
+    def finish(self, video: str, outputs: list[str]) -> None:
+        with self.__lock:
+            item = self.items[video]
+            item['outputs'] = [[name, stat(f'{self.__out_dir}/{name}').st_size]
+                               for name in outputs if path.exists(f'{self.__out_dir}/{name}')]
+            item['complete'] = True
+            self.__save()
+
+    def prune(self, videos: list[str], keep: set[str]) -> None:
+        # forget removed sources and delete whatever no current source writes
+        with self.__lock:
+            for video in list(self.items.keys()):
+                if (video not in videos):
+                    del self.items[video]
+            keep = keep | {index_path(name) for name in keep} | {MANIFEST}
+            for name in listdir(self.__out_dir):
+                if (name in keep):
+                    continue
+                try:
+                    remove(f'{self.__out_dir}/{name}')
+                except OSError:
+                    pass
+            self.__save()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import mmap
+import struct
+from os import path
+import numpy as np
+
+INDEX_EXT = 'idx'
+
+# magic, version, flags, fps, frame count
+HEADER = struct.Struct('<4sHHdI')
+MAGIC = b'TYLX'
+VERSION = 1
+
+AVIIF_KEYFRAME = 0x10
+
+
+def index_path(video_path: str) -> str:
+    return f'{video_path}.{INDEX_EXT}'
+
+
+def _avi_chunks(f, start: int, end: int, offsets: list[int]) -> bytes | None:
+    # walks a RIFF list collecting the offset of every video frame chunk,
+    # returns the contents of idx1 when it is found
+    idx1 = None
+    f.seek(start)
+    while start + 8 <= end:
+        head = f.read(8)
+        if (len(head) < 8):
+            break
+        cid, size = struct.unpack('<4sI', head)
+        if (cid in (b'RIFF', b'LIST')):
+            kind = f.read(4)
+            if (kind in (b'AVI ', b'AVIX', b'movi')):
+                found = _avi_chunks(f, start + 12, start + 8 + size, offsets)
+                idx1 = found if found is not None else idx1
+        elif (cid == b'idx1'):
+            idx1 = f.read(size)
+        elif (cid[2:] in (b'dc', b'db') and cid[:2] == b'00'):
+            offsets.append(start + 8)
+        start += 8 + size + (size & 1)
+        f.seek(start)
+    return idx1
+
+
+def scan_avi(video_path: str) -> tuple[np.ndarray, np.ndarray]:
+    offsets: list[int] = []
+    with open(video_path, 'rb') as f:
+        f.seek(0, 2)
+        idx1 = _avi_chunks(f, 0, f.tell(), offsets)
+
+    keyframes = np.ones(len(offsets), dtype=bool)
+    if (idx1 is not None):
+        entries = np.frombuffer(idx1, dtype=np.dtype(
+            [('id', 'S4'), ('flags', '<u4'), ('offset', '<u4'), ('size', '<u4')]))
+        entries = entries[np.isin(entries['id'], [b'00dc', b'00db'])]
+        # only trust the legacy index when it covers the whole file
+        if (len(entries) == len(offsets)):
+            keyframes = (entries['flags'] & AVIIF_KEYFRAME) != 0
+    return (np.array(offsets, dtype=np.uint64), keyframes)
+
+
+def write_index(video_path: str, fps: float, frame_count: int = None) -> bool:
+    ext = video_path.split('.')[-1]
+    if (ext != 'avi'):
+        return False
+    offsets, keyframes = scan_avi(video_path)
+    if (frame_count is None or frame_count > len(offsets)):
+        frame_count = len(offsets)
+    offsets, keyframes = offsets[:frame_count], keyframes[:frame_count]
+    if (frame_count > 0):
+        keyframes[0] = True
+
+    # for every frame, the closest keyframe at or before it
+    positions = np.arange(frame_count, dtype=np.uint32)
+    previous = np.maximum.accumulate(np.where(keyframes, positions, 0))
+
+    with open(index_path(video_path), 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, fps, frame_count))
+        f.write(offsets.astype('<u8').tobytes())
+        f.write(previous.astype('<u4').tobytes())
+    return True
+
+
+class VideoIndex:
+    fps: float = 0
+    frame_count: int = 0
+
+    __file = None
+    __map: mmap.mmap = None
+    __offsets: np.ndarray = None
+    __keyframes: np.ndarray = None
+
+    def __init__(self, file, map: mmap.mmap) -> None:
+        self.__file = file
+        self.__map = map
+        magic, version, _, self.fps, self.frame_count = HEADER.unpack_from(
+            map, 0)
+        if (magic != MAGIC or version != VERSION):
+            raise ValueError('not a tyler index file')
+        n = self.frame_count
+        self.__offsets = np.frombuffer(
+            map, dtype='<u8', count=n, offset=HEADER.size)
+        self.__keyframes = np.frombuffer(
+            map, dtype='<u4', count=n, offset=HEADER.size + 8*n)
+
+    @staticmethod
+    def load(video_path: str) -> VideoIndex | None:
+        idx = index_path(video_path)
+        if (not path.exists(idx)):
+            return None
+        f = open(idx, 'rb')
+        try:
+            return VideoIndex(f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (ValueError, struct.error):
+            f.close()
+            return None
+
+    def offset(self, frame: int) -> int:
+        return int(self.__offsets[frame])
+
+    def keyframe(self, frame: int) -> int:
+        return int(self.__keyframes[frame])
+
+    def wrap(self, frame: int) -> int:
+        if (self.frame_count == 0):
+            return 0
+        return frame % self.frame_count
+
+    def close(self) -> None:
+        self.__offsets = None
+        self.__keyframes = None
+        self.__map.close()
+        self.__file.close()
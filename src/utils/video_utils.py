@@ -1,12 +1,51 @@
 from typing import Generator, Any
-from os import listdir, path, mkdir
-from threading import Thread, Event
+from os import listdir, path, mkdir, cpu_count
+import json
+from threading import Thread, Event, Lock
+from queue import Queue as StageQueue, Full, Empty
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import Queue
 import cv2
 from statistics import mode
 from fractions import Fraction
+from tempfile import TemporaryDirectory, TemporaryFile
+from time import perf_counter
+from shutil import which
+from subprocess import Popen, PIPE, run
+from utils.video_index import write_index
+from utils.manifest import Manifest, fingerprint
+from utils.layout import Layout
 
 SUPPORTED_TYPES = ['mp4', 'mkv', 'avi']
 
+# name: (fourcc, container). avi outputs get a keyframe index for seeking
+OUTPUT_PROFILES = {
+    'mjpg': ('MJPG', 'avi'),
+    'mp4v': ('mp4v', 'mp4'),
+    'lossless': ('FFV1', 'avi'),
+    'raw': ('', 'avi'),
+}
+DEFAULT_PROFILE = 'mjpg'
+BENCHMARK_FRAMES = 120
+
+
+# encoder arguments giving the ffmpeg engine the same formats
+FFMPEG_ENCODERS = {
+    'mjpg': ['-c:v', 'mjpeg', '-q:v', '3'],
+    'mp4v': ['-c:v', 'mpeg4', '-q:v', '3'],
+    'lossless': ['-c:v', 'ffv1'],
+    'raw': ['-c:v', 'rawvideo', '-pix_fmt', 'bgr24'],
+}
+
+
+def output_profile(profile: str) -> tuple[str, str]:
+    return OUTPUT_PROFILES.get(profile, OUTPUT_PROFILES[DEFAULT_PROFILE])
+
+
+def fourcc(codec: str) -> int:
+    # an empty fourcc writes uncompressed frames
+    return cv2.VideoWriter_fourcc(*codec) if codec != '' else 0
+
 
 def isSupported(filename: str) -> bool:
     ext = filename.split('.')[-1]
@@ -17,18 +56,21 @@ class VideoWriter:
     __multiple: bool = None
     __writer: cv2.VideoWriter | list[cv2.VideoWriter] = None
 
-    __codec = cv2.VideoWriter_fourcc(*'MJPG')
-    __ext: str = 'avi'
+    __codec: int = None
+    __ext: str = None
 
     __path: str = None
     __fps: float = None
 
-    def __init__(self, out_dir: str, video: str, fps: float, crop: bool) -> None:
+    def __init__(self, out_dir: str, video: str, fps: float, crop: bool,
+                 profile: str = DEFAULT_PROFILE, sections: int = 6) -> None:
         self.__path = f'{out_dir}/{video}'
         self.__multiple = crop
         self.__fps = fps
+        codec, self.__ext = output_profile(profile)
+        self.__codec = fourcc(codec)
         if (crop):
-            self.__writer = [None for _ in range(6)]
+            self.__writer = [None for _ in range(sections)]
 
     def get_writer(self, img, i=0):
         h, w, _ = img.shape
@@ -46,14 +88,35 @@ class VideoWriter:
                 f'{self.__path}.{self.__ext}', self.__codec, self.__fps, (w, h), True)
             return self.__writer
 
+    @staticmethod
+    def names(video: str, crop: bool, profile: str = DEFAULT_PROFILE, sections: int = 6) -> list[str]:
+        # file names the outputs for video will get inside out_dir
+        _, ext = output_profile(profile)
+        if (crop):
+            return [f'{video}_{i}.{ext}' for i in range(sections)]
+        return [f'{video}.{ext}']
+
+    def paths(self) -> list[str]:
+        if (self.__multiple):
+            return [f'{self.__path}_{i}.{self.__ext}' for i in range(len(self.__writer))
+                    if self.__writer[i] is not None]
+        if (self.__writer is None):
+            return []
+        return [f'{self.__path}.{self.__ext}']
+
+    def outputs(self) -> int:
+        return len(self.__writer) if self.__multiple else 1
+
+    def write_output(self, frame, i=0):
+        writer = self.get_writer(frame, i)
+        writer.write(frame)
+
     def write(self, frame):
         if (self.__multiple):
-            for i in range(6):
-                writer = self.get_writer(frame[i], i)
-                writer.write(frame[i])
+            for i in range(len(self.__writer)):
+                self.write_output(frame[i], i)
         else:
-            writer = self.get_writer(frame)
-            writer.write(frame)
+            self.write_output(frame)
 
     def release(self):
         if (self.__multiple):
@@ -65,12 +128,10 @@ class VideoWriter:
                 self.__writer.release()
 
 
-def crop_frame(frame) -> list:
+def crop_frame(frame, layout: Layout) -> list:
     h_frame, w_frame, _ = frame.shape
-    h, w = int(h_frame / 2) - 1, int(w_frame / 3) - 1
     sections = []
-    for i in range(6):
-        x, y = (i % 3)*w, (i // 3)*h
+    for (x, y, w, h) in layout.crop_rects(w_frame, h_frame):
         sections.append(frame[y:y+h, x:x+w])
     return sections
 
@@ -115,6 +176,10 @@ class VideoMetadata():
         self.fps = fps
 
 
+# progress goes out at most this often, however fast frames come in
+REPORT_INTERVAL = 0.1
+
+
 class ProcessingUpdateMessage():
     frames_done: list[int] = None
     metadata: VideoMetadata = None
@@ -122,12 +187,31 @@ class ProcessingUpdateMessage():
     messages: list[str] = None
     elapsed_time: int = None
 
-    modified: Event = Event()
+    # pixel weighted totals, kept up to date as frames come in
+    amount_done: float = 0
+    amount_total: float = 0
+    completed: int = 0
+
+    modified: Event = None
+
+    __weights: list[int] = None
+    __counts: list[float] = None
+    __lock: Lock = None
 
     def __init__(self, total: int, metadata: VideoMetadata) -> None:
         self.frames_done = [0 for _ in range(total)]
         self.messages = ['' for _ in range(total)]
         self.metadata = metadata
+        self.modified = Event()
+        self.__lock = Lock()
+        if (metadata is not None):
+            self.__weights = [w * h for (w, h) in metadata.sizes]
+            self.__counts = metadata.frame_counts
+        else:
+            self.__weights = [1 for _ in range(total)]
+            self.__counts = [0 for _ in range(total)]
+        self.amount_total = sum([self.__counts[i] * self.__weights[i]
+                                 for i in range(total)])
 
     def set_message(self, msg: str, index: int = None) -> None:
         if (index is None):
@@ -142,10 +226,14 @@ class ProcessingUpdateMessage():
         self.messages[index] = msg
 
     def set_frames(self, frame: int, index: int) -> None:
-        changed = self.frames_done[index] != frame
-        if changed:
-            self.modified.set()
-        self.frames_done[index] = frame
+        # called for every frame, it only counts. readers pick the totals
+        # up on the next report
+        with self.__lock:
+            previous = self.frames_done[index]
+            self.frames_done[index] = frame
+            self.amount_done += (frame - previous) * self.__weights[index]
+            count = self.__counts[index]
+            self.completed += (frame >= count) - (previous >= count)
 
     def message(self) -> str:
         msg = self.message_general
@@ -159,17 +247,118 @@ class ProcessingUpdateMessage():
                 return msg
         return ''
 
-    def wait(self):
-        self.modified.wait()
+    def wait(self, interval: float = REPORT_INTERVAL):
+        # wakes up on messages and finished jobs, or when the next report is due
+        self.modified.wait(interval)
         self.modified.clear()
 
     def done(self):
         self.modified.set()
 
 
+class ProgressRelay():
+    # stands in for ProcessingUpdateMessage inside worker processes, frame
+    # counts cross over at the report rate instead of once per frame
+    def __init__(self, queue: Queue) -> None:
+        self.__queue = queue
+        self.__pending = None
+        self.__last_sent = 0
+
+    def set_message(self, msg: str, index: int = None) -> None:
+        self.__queue.put(('message', msg, index))
+
+    def set_frames(self, frame: int, index: int) -> None:
+        self.__pending = ('frames', frame, index)
+        now = perf_counter()
+        if (now - self.__last_sent >= REPORT_INTERVAL):
+            self.__flush()
+            self.__last_sent = now
+
+    def __flush(self) -> None:
+        if (self.__pending is not None):
+            self.__queue.put(self.__pending)
+            self.__pending = None
+
+    def done(self):
+        self.__flush()
+        self.__queue.put(('done',))
+
+
+progress_queue: Queue = None
+
+
+def _init_worker(queue: Queue) -> None:
+    global progress_queue
+    progress_queue = queue
+
+
+def _process_video_in_worker(engine, *args) -> None:
+    engine(*args, ProgressRelay(progress_queue))
+
+
+def _forward_progress(queue: Queue, update: ProcessingUpdateMessage) -> None:
+    while True:
+        item = queue.get()
+        if (item is None):
+            break
+        if (item[0] == 'message'):
+            update.set_message(item[1], item[2])
+        elif (item[0] == 'frames'):
+            update.set_frames(item[1], item[2])
+        else:
+            update.done()
+
+
+PIPELINE_DEPTH = 8
+
+
+def _put(queue: StageQueue, item, abort: Event) -> bool:
+    while (not abort.is_set()):
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _get(queue: StageQueue, abort: Event):
+    while (not abort.is_set()):
+        try:
+            return queue.get(timeout=0.1)
+        except Empty:
+            continue
+    return None
+
+
+def _stage(work, abort: Event, errors: list[Exception]) -> None:
+    # a failing stage stops the whole pipeline instead of dead-locking it
+    try:
+        work()
+    except Exception as e:
+        errors.append(e)
+        abort.set()
+
+
+def output_name(video: str, video_index: int, crop: bool) -> str:
+    if (crop):
+        return f'{video_index}'
+    return '.'.join(video.split('.')[:-1])
+
+
+def _announce_resize(video: str, video_index: int, size: tuple[int, int], shape: tuple[int, int],
+                     resize: bool, update: ProcessingUpdateMessage) -> None:
+    ar = size[0] / size[1]
+    ar_shape = shape[0] / shape[1]
+    ar_fract = Fraction(shape[0], shape[1])
+    if (resize and (ar != ar_shape)):
+        update.set_message(
+            f'Video {video} will be resized to fit aspect ratio {ar_fract.numerator}:{ar_fract.denominator}', video_index)
+
+
 def process_video(dir_path: str, video: str, video_index: int, out_dir: str,
                   shape: tuple[int, int], fps: float, resize: bool, crop: bool,
-                  update: ProcessingUpdateMessage) -> None:
+                  profile: str, layout: Layout, update: ProcessingUpdateMessage) -> None:
     # open video file
     video_path = f'{dir_path}/{video}'
     cap = cv2.VideoCapture(video_path)
@@ -180,25 +369,63 @@ def process_video(dir_path: str, video: str, video_index: int, out_dir: str,
     w_fps, frames = cap.get(cv2.CAP_PROP_FPS), cap.get(
         cv2.CAP_PROP_FRAME_COUNT)
 
-    ar = w_frame / h_frame
-    ar_shape = shape[0] / shape[1]
-    ar_fract = Fraction(shape[0], shape[1])
-    if (resize and (ar != ar_shape)):
-        update.set_message(
-            f'Video {video} will be resized to fit aspect ratio {ar_fract.numerator}:{ar_fract.denominator}', video_index)
+    _announce_resize(video, video_index, (w_frame, h_frame), shape, resize, update)
 
     # open writer for output video
-    video_name = '.'.join(video.split('.')[:-1])
     writer = VideoWriter(
         out_dir,
-        f'{video_index}' if crop else video_name,
+        output_name(video, video_index, crop),
         w_fps,
-        crop
+        crop,
+        profile,
+        layout.count
     )
 
+    # stream frames through reader -> resize/crop -> one encoder per output,
+    # bounded queues keep memory flat when a stage falls behind
+    abort = Event()
+    errors: list[Exception] = []
+    frames = StageQueue(maxsize=PIPELINE_DEPTH)
+    outputs = [StageQueue(maxsize=PIPELINE_DEPTH)
+               for _ in range(writer.outputs())]
+
+    def transform():
+        while True:
+            frame = _get(frames, abort)
+            if (frame is None):
+                break
+
+            # resize when needed
+            if (resize):
+                frame = reshape(frame, shape)
+
+            # crop video when needed
+            if (crop):
+                frame = crop_frame(frame, layout)
+            else:
+                frame = [frame]
+
+            for i in range(len(outputs)):
+                _put(outputs[i], frame[i], abort)
+        for output in outputs:
+            _put(output, None, abort)
+
+    def encode(i: int):
+        while True:
+            frame = _get(outputs[i], abort)
+            if (frame is None):
+                break
+            writer.write_output(frame, i)
+
+    stages = [Thread(target=_stage, args=[transform, abort, errors])]
+    stages += [Thread(target=_stage, args=[lambda i=i: encode(i), abort, errors])
+               for i in range(len(outputs))]
+    for stage in stages:
+        stage.start()
+
     # pass through each frame
     cnt = 0
-    while (cap.isOpened()):
+    while (cap.isOpened() and not abort.is_set()):
         # read the frame
         ret, frame = cap.read()
         if ret == False:
@@ -207,28 +434,88 @@ def process_video(dir_path: str, video: str, video_index: int, out_dir: str,
         # compute how much is done
         cnt += 1
         update.set_frames(cnt, video_index)
+        _put(frames, frame, abort)
+    _put(frames, None, abort)
 
-        # resize when needed
-        if (resize):
-            frame = reshape(frame, shape)
-
-        # crop video when needed
-        if (crop):
-            frame = crop_frame(frame)
-
-        writer.write(frame)
+    for stage in stages:
+        stage.join()
 
     # release resources
     cap.release()
     writer.release()
+
+    if (len(errors) > 0):
+        update.done()
+        raise errors[0]
+
+    # keyframe index sidecars for fast seeking on playback
+    for out_path in writer.paths():
+        write_index(out_path, w_fps, cnt)
     update.done()
 
 
-def find_metadata(srcs_dir: str, crop: bool) -> tuple[VideoMetadata, str]:
-    dir = listdir(srcs_dir)
+METADATA_CACHE = '.metadata.json'
+PROBE_WORKERS = 8
+
+
+def probe_video(video_path: str) -> tuple[int, int, float, float]:
+    cap = cv2.VideoCapture(video_path)
+    w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(
+        cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps, frames = cap.get(cv2.CAP_PROP_FPS), cap.get(
+        cv2.CAP_PROP_FRAME_COUNT)
+    cap.release()
+    return (w, h, fps, frames)
+
+
+def _read_metadata_cache(srcs_dir: str) -> dict:
+    try:
+        with open(f'{srcs_dir}/{METADATA_CACHE}') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return dict()
+
+
+def _write_metadata_cache(srcs_dir: str, cache: dict) -> None:
+    try:
+        with open(f'{srcs_dir}/{METADATA_CACHE}', 'w') as cache_file:
+            json.dump(cache, cache_file)
+    except OSError:
+        pass
+
+
+def probe_videos(srcs_dir: str, videos: list[str]) -> list[tuple[int, int, float, float]]:
+    # only files whose size or mtime changed since the last run get opened
+    cache = _read_metadata_cache(srcs_dir)
+    keys = []
+    for video in videos:
+        keys.append(fingerprint(f'{srcs_dir}/{video}'))
+    stale = [i for i in range(len(videos))
+             if cache.get(videos[i], {}).get('key') != keys[i]]
+
+    if (len(stale) > 0):
+        # opening containers is mostly waiting on storage, probe in parallel
+        with ThreadPoolExecutor(min(len(stale), PROBE_WORKERS)) as executor:
+            probes = executor.map(
+                probe_video, [f'{srcs_dir}/{videos[i]}' for i in stale])
+            for i, probe in zip(stale, probes):
+                cache[videos[i]] = {'key': keys[i], 'probe': list(probe)}
+        _write_metadata_cache(srcs_dir, cache)
+
+    return [tuple(cache[video]['probe']) for video in videos]
+
+
+def find_metadata(srcs_dir: str, crop: bool, dir: list[str] = None,
+                  layout: Layout = None) -> tuple[VideoMetadata, str]:
+    if (dir is None):
+        dir = listdir(srcs_dir)
+    if (layout is None):
+        layout = Layout.from_config()
     supported = list(filter(isSupported, dir))
 
-    unsupported = list(filter(lambda x: not isSupported(x), dir))
+    # hidden entries are our own outputs and caches
+    unsupported = list(filter(lambda x: not isSupported(
+        x) and not x.startswith('.'), dir))
     unsupported_files = ', '.join(unsupported)
     msg = ''
     if (len(unsupported) > 0):
@@ -245,84 +532,290 @@ def find_metadata(srcs_dir: str, crop: bool) -> tuple[VideoMetadata, str]:
     frame_counts = []
     min_fps = 100
     max_shape = (0, 0)
-    for i in range(total):
-        video_path = f'{srcs_dir}/{supported[i]}'
-        cap = cv2.VideoCapture(video_path)
-
-        w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(
-            cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps, frames = cap.get(cv2.CAP_PROP_FPS), cap.get(
-            cv2.CAP_PROP_FRAME_COUNT)
-
+    for (w, h, fps, frames) in probe_videos(srcs_dir, supported):
         if (w > max_shape[0] or h > max_shape[1]):
             max_shape = (w, h)
         min_fps = min(min_fps, fps)
         aspects.append((w, h))
         frame_counts.append(frames)
 
-        cap.release()
-
     common_shape = mode(aspects)
     target_ar = common_shape[0] / common_shape[1]
     shape = transformShape(max_shape, target_ar)
 
     # send initial metadata
-    t = total if crop else int(total / 6)
-    w = shape[0] if crop else 3 * shape[0]
-    h = shape[1] if crop else 2 * shape[1]
+    t = total if crop else int(total / layout.count)
+    w, h = shape if crop else layout.canvas_size(shape)
     metadata = VideoMetadata(t, frame_counts, aspects, w, h, min_fps)
     return (metadata, msg)
 
 
-def process_videos(srcs_dir: str, resize: bool, crop: bool) -> Generator[ProcessingUpdateMessage, None, None]:
-    # filter out unsopported file formats
-    dir = listdir(srcs_dir)
+def ffmpeg_available() -> bool:
+    return which('ffmpeg') is not None
+
+
+# stderr of an ffmpeg that does not understand its command line
+FFMPEG_REJECTED = ['Unrecognized option', 'Option not found']
+ffmpeg_passthrough: list[str] = None
+
+
+def ffmpeg_passthrough_args() -> list[str]:
+    # -fps_mode came with ffmpeg 5.1 and deprecates -vsync, older builds
+    # only know -vsync. asked once per process
+    global ffmpeg_passthrough
+    if (ffmpeg_passthrough is None):
+        try:
+            options = run([which('ffmpeg'), '-hide_banner', '-h', 'long'],
+                          capture_output=True, text=True).stdout
+        except OSError:
+            options = ''
+        ffmpeg_passthrough = ['-fps_mode' if '-fps_mode' in options else '-vsync',
+                              'passthrough']
+    return ffmpeg_passthrough
+
+
+def ffmpeg_filter_graph(size: tuple[int, int], shape: tuple[int, int], resize: bool, crop: bool,
+                        layout: Layout) -> str:
+    # the same resize and crop the OpenCV engine does frame by frame
+    w_frame, h_frame = size
+    filters = ['null']
+    if (resize):
+        w_frame, h_frame = transformShape(size, shape[0] / shape[1])
+        if ((w_frame, h_frame) != tuple(size)):
+            filters = [f'scale={w_frame}:{h_frame}']
+    if (not crop):
+        return f'[0:v]{",".join(filters)}[o0]'
+
+    rects = layout.crop_rects(w_frame, h_frame)
+    split = ''.join([f'[s{i}]' for i in range(len(rects))])
+    sections = [f'[s{i}]crop={w}:{h}:{x}:{y}[o{i}]'
+                for i, (x, y, w, h) in enumerate(rects)]
+    return ';'.join([f'[0:v]{",".join(filters)},split={len(rects)}{split}'] + sections)
+
+
+def process_video_ffmpeg(dir_path: str, video: str, video_index: int, out_dir: str,
+                         shape: tuple[int, int], fps: float, resize: bool, crop: bool,
+                         profile: str, layout: Layout, update: ProcessingUpdateMessage) -> None:
+    # one ffmpeg process decodes once, resizes, crops and encodes every
+    # output on its own threads
+    video_path = f'{dir_path}/{video}'
+    w_frame, h_frame, w_fps, _ = probe_video(video_path)
+    _announce_resize(video, video_index, (w_frame, h_frame), shape, resize, update)
+
+    graph = ffmpeg_filter_graph((w_frame, h_frame), shape, resize, crop, layout)
+    names = VideoWriter.names(output_name(video, video_index, crop), crop, profile, layout.count)
+    encoder = FFMPEG_ENCODERS.get(profile, FFMPEG_ENCODERS[DEFAULT_PROFILE])
+    cmd = [which('ffmpeg'), '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+           '-nostats', '-progress', 'pipe:1',
+           '-i', video_path, '-filter_complex', graph]
+    for i in range(len(names)):
+        cmd += ['-map', f'[o{i}]', '-an', *ffmpeg_passthrough_args(), *encoder,
+                '-threads', '0', f'{out_dir}/{names[i]}']
+
+    # stderr goes to a file, a damaged source can log more than a pipe
+    # holds while stdout is still being read
+    with TemporaryFile('w+') as log:
+        process = Popen(cmd, stdout=PIPE, stderr=log, text=True)
+        cnt = 0
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if (key == 'frame' and value.isdigit()):
+                cnt = int(value)
+                update.set_frames(cnt, video_index)
+        process.wait()
+        log.seek(0)
+        error = log.read()
+    if (process.returncode != 0 and any([r in error for r in FFMPEG_REJECTED])):
+        # an ffmpeg too old or too new for this command line, OpenCV
+        # does the same job
+        update.set_message(f'ffmpeg cannot process {video}, using OpenCV instead', video_index)
+        return process_video(dir_path, video, video_index, out_dir, shape, fps, resize, crop,
+                             profile, layout, update)
+    if (process.returncode != 0):
+        update.done()
+        raise RuntimeError(
+            f'ffmpeg exited with {process.returncode}: {error.strip()[-300:]}')
+
+    # keyframe index sidecars for fast seeking on playback
+    for name in names:
+        write_index(f'{out_dir}/{name}', w_fps, cnt if cnt > 0 else None)
+    update.done()
+
+
+PROCESSING_ENGINES = {
+    'opencv': process_video,
+    'ffmpeg': process_video_ffmpeg,
+}
+
+
+def process_videos(srcs_dir: str, resize: bool, crop: bool,
+                   workers: int = 0, use_processes: bool = False,
+                   profile: str = DEFAULT_PROFILE,
+                   engine: str = 'ffmpeg',
+                   layout: Layout = None) -> Generator[ProcessingUpdateMessage, None, None]:
+    # worker processes cannot see the config, the layout travels with the jobs
+    if (layout is None):
+        layout = Layout.from_config()
+
+    # filter out unsopported file formats, sorted so that cropped outputs,
+    # which are named by index, keep their names from one run to the next
+    dir = sorted(listdir(srcs_dir))
     videos = list(filter(isSupported, dir))
 
     # get total number of supported videos in srcs_dir
     total = len(videos)
 
     # send out initial metadata
-    metadata, msg = find_metadata(srcs_dir, crop)
+    metadata, msg = find_metadata(srcs_dir, crop, dir, layout)
     update = ProcessingUpdateMessage(total, metadata)
     update.set_message(msg)
 
     yield update
 
     # begin processing
-    if (not resize and not crop):
+    if (metadata is None or (not resize and not crop)):
         yield update
         return
 
-    # if an out_dir already exists, assume we are done and stop processing
-    # TODO: how we check if processing is done
+    # make output directory
     out_dir = f'{srcs_dir}/.out'
-    if path.exists(out_dir):
+    if (not path.exists(out_dir)):
+        mkdir(out_dir)
+
+    # only new, changed or unfinished sources get processed again
+    shape = (metadata.width, metadata.height)
+    profile = profile if profile in OUTPUT_PROFILES else DEFAULT_PROFILE
+    codec, container = output_profile(profile)
+    params = {'resize': resize, 'crop': crop, 'shape': list(shape), 'fps': metadata.fps,
+              'codec': codec, 'container': container, 'grid': layout.name()}
+    sources = [fingerprint(f'{srcs_dir}/{video}') for video in videos]
+    outputs = [VideoWriter.names(output_name(videos[i], i, crop), crop, profile, layout.count)
+               for i in range(total)]
+    manifest = Manifest.load(out_dir)
+    manifest.prune(videos, set(sum(outputs, [])))
+    pending = []
+    for i in range(total):
+        if (manifest.is_done(videos[i], sources[i], params, outputs[i])):
+            update.set_frames(int(metadata.frame_counts[i]), i)
+        else:
+            pending.append(i)
+
+    if (len(pending) == 0):
         update.set_message('Videos have already been processed')
         yield update
         return
 
-    # make output directory
-    mkdir(out_dir)
-
-    # process each video
-    shape = (metadata.width, metadata.height)
-    threads: list[Thread] = []
-    for i in range(total):
-        t = Thread(target=process_video, args=[
-            srcs_dir, videos[i], i, out_dir, shape, metadata.fps, resize, crop, update])
-        t.start()
-        threads.append(t)
+    # process each video, biggest jobs first so the long ones never start last
+    sizes = [metadata.frame_counts[i] * metadata.sizes[i][0] * metadata.sizes[i][1]
+             for i in range(total)]
+    order = sorted(pending, key=lambda i: sizes[i], reverse=True)
+
+    # the ffmpeg engine needs a local ffmpeg, OpenCV is always there
+    job = PROCESSING_ENGINES.get(engine, process_video)
+    if (job is process_video_ffmpeg and not ffmpeg_available()):
+        job = process_video
+
+    workers = workers if workers > 0 else (cpu_count() or 1)
+    workers = min(workers, len(pending))
+    queue: Queue = None
+    forwarder: Thread = None
+    executor: Executor = None
+    if (use_processes):
+        # worker processes report progress through a queue
+        queue = Queue()
+        forwarder = Thread(target=_forward_progress, args=[queue, update])
+        forwarder.start()
+        executor = ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(queue,))
+    else:
+        executor = ThreadPoolExecutor(workers)
+
+    futures: list[Future] = []
+    for i in order:
+        manifest.start(videos[i], sources[i], params)
+        args = [srcs_dir, videos[i], i, out_dir, shape,
+                metadata.fps, resize, crop, profile, layout]
+        if (use_processes):
+            future = executor.submit(_process_video_in_worker, job, *args)
+        else:
+            future = executor.submit(job, *args, update)
+        future.add_done_callback(lambda f, i=i: job_done(
+            f, videos[i], i, update, manifest, outputs[i]))
+        futures.append(future)
 
     running = True
     while (running):
         update.wait()
         yield update
-        running = threads_running(threads)
+        running = not all([f.done() for f in futures])
 
+    executor.shutdown()
+    if (forwarder is not None):
+        queue.put(None)
+        forwarder.join()
+        yield update
 
-def threads_running(threads: list[Thread]):
-    for t in threads:
-        if (t.is_alive()):
-            return True
-    return False
+
+def job_done(future: Future, video: str, index: int, update: ProcessingUpdateMessage,
+             manifest: Manifest, outputs: list[str]) -> None:
+    error = future.exception()
+    if (error is not None):
+        update.set_message(f'Video {video} could not be processed: {error}', index)
+    else:
+        manifest.finish(video, outputs)
+    update.done()
+
+
+def benchmark_profiles(video_path: str, frames: int = BENCHMARK_FRAMES,
+                       profiles: list[str] = None) -> list[dict]:
+    # encodes the same sample with every profile and decodes it back the way
+    # playback does, one frame after the other
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 24
+    sample = []
+    while (len(sample) < frames):
+        ret, frame = cap.read()
+        if ret == False:
+            break
+        sample.append(frame)
+    cap.release()
+    if (len(sample) == 0):
+        return []
+
+    results = []
+    with TemporaryDirectory() as tmp:
+        for profile in profiles or list(OUTPUT_PROFILES.keys()):
+            writer = VideoWriter(tmp, profile, fps, False, profile)
+            # not every OpenCV build has every encoder, FFV1 is often missing
+            if (not writer.get_writer(sample[0]).isOpened()):
+                writer.release()
+                results.append({'profile': profile, 'error': 'encoder not available'})
+                continue
+            start = perf_counter()
+            for frame in sample:
+                writer.write(frame)
+            writer.release()
+            encode_time = perf_counter() - start
+
+            out_path = writer.paths()[0]
+            if (not path.exists(out_path)):
+                results.append({'profile': profile, 'error': 'nothing was written'})
+                continue
+            cap = cv2.VideoCapture(out_path)
+            decoded = 0
+            start = perf_counter()
+            while (cap.read()[0]):
+                decoded += 1
+            decode_time = perf_counter() - start
+            cap.release()
+
+            decode_fps = decoded / decode_time if decode_time > 0 else 0
+            results.append({
+                'profile': profile,
+                'size_mb': round(path.getsize(out_path) / 2**20, 2),
+                'encode_fps': round(len(sample) / encode_time, 1),
+                'decode_fps': round(decode_fps, 1),
+                # how many sections one core can keep decoding in real time
+                'sections': round(decode_fps / fps, 1),
+            })
+    return results
@@ -0,0 +1,14 @@
+import sys
+from os import path
+sys.path.insert(0, path.join(path.dirname(__file__), '..', 'src'))
+
+from tiles import tile as T
+from tiles.governor import QualityGovernor
+from tiles.section import decode_backend
+
+
+def test_render_builds_governor() -> None:
+    # same construction as render(), the module must not shadow the helper
+    governor = QualityGovernor(4, 24, len(T.quality_levels(decode_backend())))
+    assert governor.levels == [0, 0, 0, 0]
+